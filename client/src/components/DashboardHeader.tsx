@@ -1,6 +1,6 @@
 import { useState } from "react";
 import { Search, Bell, User as UserIcon, LogOut, Settings, User } from "lucide-react";
-import { useSession, authClient } from "../lib/auth-client";
+import { useSession, signOut } from "../lib/auth-client";
 import { motion, AnimatePresence } from "framer-motion";
 
 export function DashboardHeader() {
@@ -80,7 +80,7 @@ export function DashboardHeader() {
                                     <button
                                         type="button"
                                         onClick={async () => {
-                                            await authClient.signOut();
+                                            await signOut();
                                             window.location.href = "/login";
                                         }}
                                         className="w-full flex items-center gap-2 px-3 py-2 text-sm text-red-600 hover:bg-red-50 rounded-lg transition-colors text-left"
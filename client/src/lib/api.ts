@@ -35,6 +35,14 @@ export async function uploadFiles(files: File[]): Promise<UploadResponse> {
   return response.json();
 }
 
+export async function endApiSession() {
+  // Revokes the session on the API server, which caches authenticated sessions.
+  await fetch(`${API_BASE_URL}/api/session`, {
+    method: "DELETE",
+    credentials: "include",
+  });
+}
+
 export async function getRecords() {
   const response = await fetch(`${API_BASE_URL}/api/upload/records`, {
     credentials: "include",
@@ -96,7 +104,7 @@ export async function startTimelineAnalysis() {
 }
 
 export async function getVitals() {
-  const response = await fetch(`${API_BASE_URL}/api/analyze/vitals`, {
+  const response = await fetch(`${API_BASE_URL}/api/analyze/vitals?limit=1`, {
     credentials: "include",
   });
   if (!response.ok) throw new Error("Failed to fetch vitals");
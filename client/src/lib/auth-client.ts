@@ -1,6 +1,13 @@
 import { createAuthClient } from "better-auth/react"
+import { endApiSession } from "./api"
 
 export const authClient = createAuthClient({
     baseURL: typeof window !== "undefined" ? window.location.origin : "http://localhost:3000"
 })
 export const { signIn, signUp, useSession } = authClient;
+
+export async function signOut() {
+    // The API server must drop the session before the cookie is cleared.
+    await endApiSession().catch(() => {})
+    return authClient.signOut()
+}
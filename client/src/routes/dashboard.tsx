@@ -15,7 +15,7 @@ import {
   TrendingUp,
   BarChart,
 } from "lucide-react";
-import { useSession, authClient } from "../lib/auth-client";
+import { useSession, signOut } from "../lib/auth-client";
 import { DashboardHeader } from "../components/DashboardHeader";
 import { MultiSessionIndicator } from "../components/MultiSessionIndicator";
 
@@ -69,7 +69,7 @@ function DashboardLayout() {
 
         <div className="p-4 border-t border-slate-100">
           <button
-            onClick={() => authClient.signOut()}
+            onClick={() => signOut()}
             className="flex items-center gap-3 w-full px-3 py-2 text-sm font-medium text-slate-600 rounded-lg hover:bg-slate-50 transition-colors"
           >
             <LogOut size={18} />
@@ -0,0 +1,37 @@
+"""add series hash to medical record
+
+Revision ID: 74f808eb5708
+Revises: 9e3d5b18c7a4
+Create Date: 2026-10-17 20:41:09.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74f808eb5708'
+down_revision: Union[str, Sequence[str], None] = '9e3d5b18c7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('medicalrecord', sa.Column('series_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    # Series records kept a digest of their slice hashes in file_hash; move it
+    # and point file_hash at the key slice that s3_key references.
+    op.execute(
+        "UPDATE medicalrecord SET series_hash = file_hash, "
+        "file_hash = series_instances -> (json_array_length(series_instances) / 2) ->> 'file_hash' "
+        "WHERE series_uid IS NOT NULL AND series_instances IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE medicalrecord SET file_hash = series_hash WHERE series_hash IS NOT NULL")
+    op.drop_column('medicalrecord', 'series_hash')
@@ -0,0 +1,39 @@
+"""version record extraction cache
+
+Revision ID: 9e3d5b18c7a4
+Revises: 5c9a2e71d4b8
+Create Date: 2026-10-17 19:03:27.914052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3d5b18c7a4'
+down_revision: Union[str, Sequence[str], None] = '5c9a2e71d4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows get an empty version, which never matches a prompt
+    # version, so they are re-extracted on first use.
+    op.add_column('record_extraction', sa.Column('version', sqlmodel.sql.sqltypes.AutoString(), nullable=False, server_default=''))
+    op.alter_column('record_extraction', 'version', server_default=None)
+    op.drop_constraint('record_extraction_pkey', 'record_extraction', type_='primary')
+    op.create_primary_key('record_extraction_pkey', 'record_extraction', ['file_hash', 'kind', 'version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Several versions of one (file_hash, kind) cannot share the old key;
+    # the table is a cache, so it is simply emptied.
+    op.execute('DELETE FROM record_extraction')
+    op.drop_constraint('record_extraction_pkey', 'record_extraction', type_='primary')
+    op.drop_column('record_extraction', 'version')
+    op.create_primary_key('record_extraction_pkey', 'record_extraction', ['file_hash', 'kind'])
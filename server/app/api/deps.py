@@ -1,14 +1,39 @@
 from fastapi import Request, HTTPException, Depends
-from sqlmodel import Session, select
-from app.core.db import get_session
+from pydantic import BaseModel
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import get_async_session
 from app.core.config import settings
-from app.models import User, Session as AuthSession
+from app.models import User, Session as AuthSession, utcnow
+from app.services.cache_service import ResultCache
 from datetime import datetime, UTC
+import hashlib
 
+# session token -> user principal; entries never outlive the session itself
+session_cache = ResultCache(
+    namespace="auth:session",
+    ttl=settings.SESSION_CACHE_TTL_SECONDS,
+    maxsize=settings.SESSION_CACHE_MAX_ENTRIES,
+)
 
-async def get_current_user(
-    request: Request, db: Session = Depends(get_session)
-) -> User:
+
+class CurrentUser(BaseModel):
+    """The authenticated principal; not an ORM object, so it carries no relationships."""
+    id: str
+    email: str
+    name: str
+
+
+def _session_cache_key(session_token: str) -> str:
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+
+async def invalidate_session(session_token: str):
+    """Drop a session token from the auth cache, e.g. on logout or session deletion."""
+    await session_cache.delete(_session_cache_key(session_token))
+
+
+def get_session_token(request: Request) -> str:
     session_token = request.cookies.get("__Secure-medlm.session_token")
     # session_token = request.cookies.get("medlm.session_token")
     # print(session_token, "ses")
@@ -17,20 +42,48 @@ async def get_current_user(
         session_token = session_token.split(".")[0]
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    return session_token
+
+
+async def get_current_user(
+    request: Request, db: AsyncSession = Depends(get_async_session)
+) -> CurrentUser:
+    session_token = get_session_token(request)
 
-    session = db.exec(
+    cache_key = _session_cache_key(session_token)
+    principal = await session_cache.get(cache_key)
+    if principal and datetime.fromisoformat(principal["expires_at"]) > datetime.now(UTC):
+        return CurrentUser.model_validate(principal["user"])
+
+    session = (await db.exec(
         select(AuthSession).where(
             AuthSession.token == session_token,
-            AuthSession.expiresAt > datetime.now(UTC),
+            # expiresAt is a naive UTC TIMESTAMP; asyncpg rejects aware values.
+            AuthSession.expiresAt > utcnow(),
         )
-    ).first()
+    )).first()
 
     if not session:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
-    user = db.get(User, session.userId)
+    row = (await db.exec(
+        select(User.id, User.email, User.name).where(User.id == session.userId)
+    )).first()
 
-    if not user:
+    if not row:
         raise HTTPException(status_code=401, detail="User not found")
 
+    user = CurrentUser(id=row.id, email=row.email, name=row.name)
+
+    ttl = min(
+        settings.SESSION_CACHE_TTL_SECONDS,
+        int((session.expiresAt - utcnow()).total_seconds()),
+    )
+    expires_at = session.expiresAt.replace(tzinfo=UTC)
+    await session_cache.set(
+        cache_key,
+        {"user": user.model_dump(), "expires_at": expires_at.isoformat()},
+        ttl=ttl,
+    )
+
     return user
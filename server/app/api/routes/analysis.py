@@ -1,25 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
-from app.api.deps import get_current_user
-from app.core.db import get_session
-from app.models import User
+from app.api.deps import CurrentUser, get_current_user
+from app.core.db import get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 router = APIRouter(prefix="/api/analyze", tags=["analysis"])
 
 from app.worker import run_analysis_job
 from datetime import datetime, timedelta, UTC
-from app.models import HealthTrend, TimelineEvent, HealthVital
+from app.models import HealthTrend, TimelineEvent, HealthVital, MedicalRecord
+from sqlalchemy import exists, tuple_
 from sqlmodel import select, col
+from uuid import UUID
+import base64
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def has_records(db: Session, user_id: str) -> bool:
+    """Check for any record with a single EXISTS query instead of loading them."""
+    return db.exec(select(exists().where(MedicalRecord.user_id == user_id))).one()
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def paginate_history(
+    db: Session,
+    model,
+    user_id: str,
+    available_fields: list[str],
+    limit: int,
+    cursor: str | None,
+    fields: str | None,
+) -> tuple[list[dict], str | None]:
+    """
+    Keyset-paginate a user's analysis history, newest first.
+
+    Pages are ordered by (created_at, id) and the cursor encodes the last row
+    of the previous page. `fields` is a comma-separated projection; only the
+    requested columns are selected, so summaries can skip analysis_data.
+    Every item always includes its id.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "id"]
+        unknown = sorted(set(requested) - set(available_fields))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available_fields)}",
+            )
+    else:
+        requested = available_fields
+
+    selected = ["id", "created_at"] + [f for f in requested if f != "created_at"]
+    statement = select(*[getattr(model, name) for name in selected]).where(
+        model.user_id == user_id
+    )
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.id) < tuple_(created_at, row_id)
+        )
+    statement = statement.order_by(
+        col(model.created_at).desc(), col(model.id).desc()
+    ).limit(limit + 1)
+
+    rows = db.exec(statement).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = []
+    for row in rows:
+        item = {"id": str(row.id)}
+        for name in requested:
+            value = getattr(row, name)
+            item[name] = value.isoformat() if isinstance(value, datetime) else value
+        items.append(item)
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return items, next_cursor
 
 
 @router.post("/trends")
 async def analyze_trends(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_session)
 ):
     """
     Trigger background analysis for trends.
     """
-    if not current_user.records:
+    if not has_records(db, current_user.id):
         raise HTTPException(status_code=400, detail="No records found to analyze.")
 
     stmt = (
@@ -48,12 +129,12 @@ async def analyze_trends(
 
 @router.post("/timeline")
 async def analyze_timeline(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_session)
 ):
     """
     Trigger background analysis for timeline.
     """
-    if not current_user.records:
+    if not has_records(db, current_user.id):
         raise HTTPException(status_code=400, detail="No records found to analyze.")
 
     stmt = (
@@ -82,37 +163,33 @@ async def analyze_timeline(
 
 @router.get("/trends")
 async def get_trends(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
 ):
     """
-    Get all health trend analyses for the current user.
-    Returns trends sorted by creation date (newest first).
+    Get health trend analyses for the current user, newest first.
+    Paginated with `limit`/`cursor`; `fields` selects which columns to return.
     """
-    statement = (
-        select(HealthTrend)
-        .where(HealthTrend.user_id == current_user.id)
-        .order_by(col(HealthTrend.created_at).desc())
+    trends, next_cursor = paginate_history(
+        db,
+        HealthTrend,
+        current_user.id,
+        ["trend_summary", "analysis_data", "created_at", "updated_at"],
+        limit,
+        cursor,
+        fields,
     )
-    trends = db.exec(statement).all()
 
-    return {
-        "trends": [
-            {
-                "id": str(trend.id),
-                "trend_summary": trend.trend_summary,
-                "analysis_data": trend.analysis_data,
-                "created_at": trend.created_at.isoformat(),
-                "updated_at": trend.updated_at.isoformat(),
-            }
-            for trend in trends
-        ],
-        "count": len(trends),
-    }
+    return {"trends": trends, "count": len(trends), "next_cursor": next_cursor}
 
 
 @router.get("/trends/latest")
 async def get_latest_trend(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get the latest health trend analysis for the current user.
@@ -123,7 +200,7 @@ async def get_latest_trend(
         .order_by(col(HealthTrend.created_at).desc())
         .limit(1)
     )
-    trend = db.exec(statement).first()
+    trend = (await db.exec(statement)).first()
 
     if not trend:
         raise HTTPException(
@@ -142,38 +219,39 @@ async def get_latest_trend(
 
 @router.get("/timeline")
 async def get_timeline(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
 ):
     """
-    Get all timeline events for the current user.
-    Returns timeline events sorted by creation date (newest first).
+    Get timeline analyses for the current user, newest first.
+    Paginated with `limit`/`cursor`; `fields` selects which columns to return.
     """
-    statement = (
-        select(TimelineEvent)
-        .where(TimelineEvent.user_id == current_user.id)
-        .order_by(col(TimelineEvent.created_at).desc())
+    events, next_cursor = paginate_history(
+        db,
+        TimelineEvent,
+        current_user.id,
+        [
+            "analysis_summary",
+            "timeline_summary",
+            "analysis_data",
+            "created_at",
+            "updated_at",
+        ],
+        limit,
+        cursor,
+        fields,
     )
-    events = db.exec(statement).all()
 
-    return {
-        "timeline_events": [
-            {
-                "id": str(event.id),
-                "analysis_summary": event.analysis_summary,
-                "timeline_summary": event.timeline_summary,
-                "analysis_data": event.analysis_data,
-                "created_at": event.created_at.isoformat(),
-                "updated_at": event.updated_at.isoformat(),
-            }
-            for event in events
-        ],
-        "count": len(events),
-    }
+    return {"timeline_events": events, "count": len(events), "next_cursor": next_cursor}
 
 
 @router.get("/timeline/latest")
 async def get_latest_timeline(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get the latest timeline event for the current user.
@@ -184,7 +262,7 @@ async def get_latest_timeline(
         .order_by(col(TimelineEvent.created_at).desc())
         .limit(1)
     )
-    event = db.exec(statement).first()
+    event = (await db.exec(statement)).first()
 
     if not event:
         raise HTTPException(
@@ -204,12 +282,12 @@ async def get_latest_timeline(
 
 @router.post("/vitals")
 async def analyze_vitals(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_session)
 ):
     """
     Trigger background analysis for vitals.
     """
-    if not current_user.records:
+    if not has_records(db, current_user.id):
         raise HTTPException(status_code=400, detail="No records found to analyze.")
 
     stmt = (
@@ -238,35 +316,33 @@ async def analyze_vitals(
 
 @router.get("/vitals")
 async def get_vitals(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
 ):
     """
-    Get all vitals analyses for the current user.
+    Get vitals analyses for the current user, newest first.
+    Paginated with `limit`/`cursor`; `fields` selects which columns to return.
     """
-    statement = (
-        select(HealthVital)
-        .where(HealthVital.user_id == current_user.id)
-        .order_by(col(HealthVital.created_at).desc())
+    vitals, next_cursor = paginate_history(
+        db,
+        HealthVital,
+        current_user.id,
+        ["analysis_data", "created_at", "updated_at"],
+        limit,
+        cursor,
+        fields,
     )
-    vitals = db.exec(statement).all()
 
-    return {
-        "vitals": [
-            {
-                "id": str(vital.id),
-                "analysis_data": vital.analysis_data,
-                "created_at": vital.created_at.isoformat(),
-                "updated_at": vital.updated_at.isoformat(),
-            }
-            for vital in vitals
-        ],
-        "count": len(vitals),
-    }
+    return {"vitals": vitals, "count": len(vitals), "next_cursor": next_cursor}
 
 
 @router.get("/vitals/latest")
 async def get_latest_vitals(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get the latest vitals analysis for the current user.
@@ -277,8 +353,7 @@ async def get_latest_vitals(
         .order_by(col(HealthVital.created_at).desc())
         .limit(1)
     )
-    vital = db.exec(statement).first()
-    print(vital)
+    vital = (await db.exec(statement)).first()
 
     if not vital:
         raise HTTPException(
@@ -1,10 +1,8 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
-from datetime import datetime, UTC
 from sse_starlette.sse import EventSourceResponse
-from app.api.deps import get_current_user
-from app.core.db import get_session
-from sqlmodel import Session
-from app.models import User
+from app.api.deps import CurrentUser, get_current_user
+from app.core.db import get_async_session, async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.services.gemini_service import gemini_service
 from app.services.llm_service import llm_service
 from app.core.crypto import encrypt_content, decrypt_content
@@ -13,7 +11,7 @@ from pydantic import BaseModel
 import asyncio
 from uuid import UUID, uuid4
 from sqlmodel import select
-from app.models import User, ChatSession, ChatMessage
+from app.models import ChatSession, ChatMessage, utcnow
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +33,8 @@ class ChatMedLMRequest(BaseModel):
 @router.post("")
 async def chat_with_context(
     request: ChatRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """
     Stream chat responses using LLM service and persist history.
@@ -45,12 +43,12 @@ async def chat_with_context(
 
     # Ensure session exists or create one
     if request.session_id:
-        chat_session = db.exec(
+        chat_session = (await db.exec(
             select(ChatSession).where(
                 ChatSession.id == request.session_id,
                 ChatSession.user_id == current_user.id
             )
-        ).first()
+        )).first()
         if not chat_session:
             raise HTTPException(status_code=404, detail="Chat session not found")
     else:
@@ -59,8 +57,8 @@ async def chat_with_context(
             title=encrypt_content(request.message[:50]),  # Encrypt title
         )
         db.add(chat_session)
-        db.commit()
-        db.refresh(chat_session)
+        await db.commit()
+        await db.refresh(chat_session)
 
     # Save user message
     user_message = ChatMessage(
@@ -70,7 +68,7 @@ async def chat_with_context(
         content=encrypt_content(request.message), # Encrypt content
     )
     db.add(user_message)
-    db.commit()
+    await db.commit()
 
     async def event_generator():
         try:
@@ -102,14 +100,14 @@ async def chat_with_context(
                 content=encrypt_content(full_response), # Encrypt content
             )
             # Need a new session for the generator because the parent one might be closed
-            with Session(db.bind) as new_db:
+            async with AsyncSession(async_engine) as new_db:
                 new_db.add(ai_message)
                 # Update session timestamp
-                session_to_update = new_db.get(ChatSession, chat_session.id)
+                session_to_update = await new_db.get(ChatSession, chat_session.id)
                 if session_to_update:
-                    session_to_update.updated_at = datetime.now(UTC)
+                    session_to_update.updated_at = utcnow()
                     new_db.add(session_to_update)
-                new_db.commit()
+                await new_db.commit()
 
             logger.info(
                 f"Streaming complete. Sent {chunk_count} chunks, {len(full_response)} chars total"
@@ -127,15 +125,15 @@ async def chat_with_context(
 
 @router.get("/sessions")
 async def list_chat_sessions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """List all chat sessions for the current user."""
-    sessions = db.exec(
+    sessions = (await db.exec(
         select(ChatSession)
         .where(ChatSession.user_id == current_user.id)
         .order_by(ChatSession.updated_at.desc())
-    ).all()
+    )).all()
     
     # Decrypt titles for response
     for s in sessions:
@@ -147,24 +145,24 @@ async def list_chat_sessions(
 @router.get("/sessions/{session_id}/messages")
 async def get_chat_messages(
     session_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """Get all messages for a specific session."""
-    session = db.exec(
+    session = (await db.exec(
         select(ChatSession).where(
             ChatSession.id == session_id,
             ChatSession.user_id == current_user.id
         )
-    ).first()
+    )).first()
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
-    messages = db.exec(
+    messages = (await db.exec(
         select(ChatMessage)
         .where(ChatMessage.session_id == session_id)
         .order_by(ChatMessage.created_at.asc())
-    ).all()
+    )).all()
     
     # Decrypt content for response
     for m in messages:
@@ -176,19 +174,19 @@ async def get_chat_messages(
 @router.delete("/sessions/{session_id}")
 async def delete_chat_session(
     session_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """Delete a chat session."""
-    session = db.exec(
+    session = (await db.exec(
         select(ChatSession).where(
             ChatSession.id == session_id,
             ChatSession.user_id == current_user.id
         )
-    ).first()
+    )).first()
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
     return {"message": "Chat session deleted"}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.deps import get_session_token, invalidate_session
+from app.core.db import get_async_session
+from app.models import Session as AuthSession
+
+router = APIRouter(prefix="/api/session", tags=["auth"])
+
+
+@router.delete("")
+async def end_session(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Log out: delete the session row and drop it from the auth cache, so the
+    token stops authenticating immediately instead of after the cache TTL.
+    """
+    session_token = get_session_token(request)
+
+    # Deleted before the cache entry, so a concurrent request cannot re-cache it.
+    await db.execute(delete(AuthSession).where(AuthSession.token == session_token))
+    await db.commit()
+    await invalidate_session(session_token)
+
+    return {"message": "Logged out"}
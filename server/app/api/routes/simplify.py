@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, Body
-from app.api.deps import get_current_user
-from app.models import User
+from app.api.deps import CurrentUser, get_current_user
 from app.services.llm_service import llm_service
 import logging
 from pydantic import BaseModel
@@ -17,7 +16,7 @@ class SimplifyRequest(BaseModel):
 @router.post("")
 async def simplify_text(
     request: SimplifyRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Simplify complex medical text for layman understanding.
@@ -27,7 +26,9 @@ async def simplify_text(
     )
 
     try:
-        prediction = llm_service.simplify_text(input_text=request.input_text)
+        prediction = await llm_service.simplify_text_async(
+            input_text=request.input_text
+        )
         simplified_text = prediction.simplified
 
         logger.info(f"Text simplification completed for user {current_user.id}")
@@ -43,3 +44,11 @@ async def simplify_text(
         return {
             "error": f"I apologize, but I encountered an error while simplifying the text: {str(e)}"
         }
+
+
+@router.get("/cache-stats")
+async def simplify_cache_stats(current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Hit/miss counters for the simplification result cache.
+    """
+    return await llm_service.simplify_cache_stats()
@@ -1,24 +1,30 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sse_starlette.sse import EventSourceResponse
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, get_current_user
 from app.services.stream_service import stream_service
-from app.models import User
 
 router = APIRouter(tags=["stream"])
 
 
 @router.get("/api/stream")
-async def stream_events(current_user: User = Depends(get_current_user)):
+async def stream_events(
+    current_user: CurrentUser = Depends(get_current_user),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+):
     """
     SSE Endpoint for real-time updates.
     Listens to a user-specific Redis channel.
+    Reconnecting clients send Last-Event-ID to resume missed events.
     """
     channel = f"user:{current_user.id}:status"
 
     async def event_generator():
         yield {"event": "connected", "data": "connected"}
-        async for message in stream_service.subscribe(channel):
-            yield {"data": message}
+        async for event in stream_service.subscribe_events(channel, last_event_id):
+            if event["id"]:
+                yield {"id": event["id"], "data": event["data"]}
+            else:
+                yield {"data": event["data"]}
 
     return EventSourceResponse(event_generator())
 
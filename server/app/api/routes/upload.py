@@ -2,17 +2,26 @@ from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from sqlmodel import Session
 from typing import List
 from datetime import datetime
+import asyncio
+import hashlib
 import mimetypes
 import logging
 from pydantic import BaseModel
 
-from app.api.deps import get_current_user
-from app.core.db import get_session
-from app.models import User, MedicalRecord
+from app.api.deps import CurrentUser, get_current_user
+from app.core.config import settings
+from app.core.db import get_session, get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import MedicalRecord
+from app.services.dicom_service import dicom_service
 from app.services.storage import storage_service
+from app.services.stream_service import stream_service
 from app.worker import process_medical_record
 
-from sqlmodel import select, func
+from sqlalchemy import cast, exists, or_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import select, col
+from celery import group
 from app.worker import run_analysis_job
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
@@ -29,6 +38,113 @@ ALLOWED_EXTENSIONS = {
 }
 
 
+def is_blob_referenced(db: Session, storage_key: str) -> bool:
+    """Check whether any record, or any slice of a series record, still points at a stored blob."""
+    return db.exec(
+        select(
+            exists().where(
+                or_(
+                    MedicalRecord.s3_key == storage_key,
+                    cast(MedicalRecord.series_instances, JSONB).contains(
+                        [{"s3_key": storage_key}]
+                    ),
+                )
+            )
+        )
+    ).one()
+
+
+SLICE_FIELDS = ("sop_uid", "instance_number", "position", "file_name", "s3_key", "file_hash", "file_size")
+
+
+def read_slice_headers(storage_keys: List[str]) -> List[dict | None]:
+    return [
+        dicom_service.read_instance_header(storage_service.get_file_path(key))
+        for key in storage_keys
+    ]
+
+
+def build_series_records(
+    db: Session,
+    user_id: str,
+    slices: List[dict],
+    kept_keys: set,
+    discarded_keys: set,
+    skipped_files: List[str],
+) -> List[MedicalRecord]:
+    """
+    Group DICOM slices into one record per series.
+
+    Slices of a series the user already has are appended to that record,
+    skipping SOP instances it already references. Returns the new and
+    extended records, which all need (re)processing.
+    """
+    groups = {}
+    for item in slices:
+        groups.setdefault((item["study_uid"], item["series_uid"]), []).append(item)
+
+    existing = {
+        record.series_uid: record
+        for record in db.exec(
+            select(MedicalRecord).where(
+                MedicalRecord.user_id == user_id,
+                col(MedicalRecord.series_uid).in_({uid for _, uid in groups}),
+            )
+        ).all()
+    }
+
+    records = []
+    for (_, series_uid), members in groups.items():
+        record = existing.get(series_uid)
+        instances = list(record.series_instances or []) if record else []
+        # Slice blobs are referenced from series_instances, not s3_key.
+        kept_keys.update(instance["s3_key"] for instance in instances)
+        known = {instance["sop_uid"] for instance in instances}
+
+        added = []
+        for item in members:
+            item["sop_uid"] = item["sop_uid"] or item["file_hash"]
+            if item["sop_uid"] in known:
+                skipped_files.append(item["file_name"])
+                discarded_keys.add(item["s3_key"])
+                continue
+            known.add(item["sop_uid"])
+            kept_keys.add(item["s3_key"])
+            added.append({field: item[field] for field in SLICE_FIELDS})
+
+        if not added:
+            continue
+
+        instances = dicom_service.sort_instances(instances + added)
+        if record is None:
+            record = MedicalRecord(
+                user_id=user_id,
+                file_name="",
+                file_type="dicom",
+                s3_key="",
+                mime_type="application/dicom",
+                series_uid=series_uid,
+                processed_at=None,
+            )
+        if len(instances) == 1:
+            record.file_name = instances[0]["file_name"]
+        else:
+            label = members[0]["description"] or members[0]["modality"] or "DICOM"
+            record.file_name = f"{label} series ({len(instances)} images)"
+        key_slice = instances[len(instances) // 2]
+        record.s3_key = key_slice["s3_key"]
+        record.file_hash = key_slice["file_hash"]
+        record.series_hash = hashlib.sha256(
+            "".join(sorted(instance["file_hash"] for instance in instances)).encode()
+        ).hexdigest()
+        record.file_size = sum(instance["file_size"] for instance in instances)
+        record.series_instances = instances
+        record.processed_at = None
+        records.append(record)
+
+    return records
+
+
 def get_file_type(filename: str, mime_type: str) -> str:
     """Determine the file type based on filename and MIME type."""
     if mime_type == "application/pdf" or filename.lower().endswith(".pdf"):
@@ -46,7 +162,7 @@ def get_file_type(filename: str, mime_type: str) -> str:
 @router.post("/")
 async def upload_files(
     files: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """
@@ -56,71 +172,149 @@ async def upload_files(
 
     uploaded_records = []
     skipped_files = []
-    existing_count = db.exec(
-        select(func.count(MedicalRecord.id)).where(
-            MedicalRecord.user_id == current_user.id
-        )
+    is_initial_upload = not db.exec(
+        select(exists().where(MedicalRecord.user_id == current_user.id))
     ).one()
-    is_initial_upload = existing_count == 0
 
+    # Reject unsupported types before anything is written.
+    mime_types = []
     for file in files:
-        existing_record = db.exec(
-            select(MedicalRecord).where(
-                MedicalRecord.user_id == current_user.id,
-                MedicalRecord.file_name == file.filename,
-            )
-        ).first()
-
-        if existing_record:
-            skipped_files.append(file.filename)
-            logger.info(
-                f"Skipping duplicate file {file.filename} for user {current_user.id}"
-            )
-            continue
-
         mime_type = (
             file.content_type
             or mimetypes.guess_type(file.filename)[0]
             or "application/octet-stream"
         )
-
         try:
-            file_type = get_file_type(file.filename, mime_type)
+            get_file_type(file.filename, mime_type)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        mime_types.append(mime_type)
+
+    stored_files = []
+    for file in files:
+        stored_files.append(
+            await asyncio.to_thread(
+                storage_service.save_file, file.file, file.filename, current_user.id
+            )
+        )
+
+    # One query for all duplicates: same content as an existing record, or,
+    # for records from before hashing, the same name.
+    existing = db.exec(
+        select(
+            MedicalRecord.file_hash, MedicalRecord.file_name, MedicalRecord.s3_key
+        ).where(
+            MedicalRecord.user_id == current_user.id,
+            or_(
+                col(MedicalRecord.file_hash).in_({f.file_hash for f in stored_files}),
+                (MedicalRecord.file_hash == None)  # noqa: E711
+                & col(MedicalRecord.file_name).in_({f.filename for f in files}),
+            ),
+        )
+    ).all()
+    seen_hashes = {row.file_hash for row in existing if row.file_hash}
+    legacy_names = {row.file_name for row in existing if not row.file_hash}
+    kept_keys = {row.s3_key for row in existing}
+
+    # DICOM slices with a series UID become one record per series instead
+    # of one record per file.
+    slice_headers = {}
+    if settings.DICOM_SERIES_INGEST:
+        dicom_indices = [
+            index
+            for index, (file, mime_type) in enumerate(zip(files, mime_types))
+            if get_file_type(file.filename, mime_type) == "dicom"
+        ]
+        if dicom_indices:
+            headers = await asyncio.to_thread(
+                read_slice_headers, [stored_files[i].storage_key for i in dicom_indices]
+            )
+            slice_headers = {
+                index: header for index, header in zip(dicom_indices, headers) if header
+            }
+
+    records = []
+    series_slices = []
+    discarded_keys = set()
+    for index, (file, mime_type, stored) in enumerate(
+        zip(files, mime_types, stored_files)
+    ):
+        if stored.file_hash in seen_hashes or file.filename in legacy_names:
+            skipped_files.append(file.filename)
+            discarded_keys.add(stored.storage_key)
+            logger.info(
+                f"Skipping duplicate file {file.filename} for user {current_user.id}"
+            )
+            continue
 
-        storage_key = storage_service.save_file(
-            file.file, file.filename, current_user.id
+        seen_hashes.add(stored.file_hash)
+        kept_keys.add(stored.storage_key)
+        if index in slice_headers:
+            series_slices.append(
+                {
+                    **slice_headers[index],
+                    "file_name": file.filename,
+                    "s3_key": stored.storage_key,
+                    "file_hash": stored.file_hash,
+                    "file_size": stored.file_size,
+                }
+            )
+            continue
+
+        records.append(
+            MedicalRecord(
+                user_id=current_user.id,
+                file_name=file.filename,
+                file_type=get_file_type(file.filename, mime_type),
+                s3_key=stored.storage_key,
+                mime_type=mime_type,
+                file_hash=stored.file_hash,
+                file_size=stored.file_size,
+                processed_at=None,
+            )
         )
 
-        record = MedicalRecord(
-            user_id=current_user.id,
-            file_name=file.filename,
-            file_type=file_type,
-            s3_key=storage_key,
-            mime_type=mime_type,
-            processed_at=None,
+    if series_slices:
+        records.extend(
+            build_series_records(
+                db, current_user.id, series_slices, kept_keys, discarded_keys, skipped_files
+            )
         )
 
-        db.add(record)
+    # Ids and timestamps are client-side defaults, so read them before the
+    # commit expires the instances.
+    uploaded_records = [
+        {
+            "id": str(record.id),
+            "file_name": record.file_name,
+            "file_type": record.file_type,
+            "created_at": record.created_at.isoformat(),
+        }
+        for record in records
+    ]
+
+    if records:
+        db.add_all(records)
         db.commit()
-        db.refresh(record)
 
+    # A blob written for a duplicate is only removed if nothing points at it.
+    for storage_key in discarded_keys - kept_keys:
+        if not is_blob_referenced(db, storage_key):
+            storage_service.delete_file(storage_key)
+
+    if uploaded_records:
         try:
-            logger.info(f"Triggering worker task for record {record.id}")
-            task = process_medical_record.delay(str(record.id), current_user.id)
-            logger.info(f"Worker task triggered successfully. Task ID: {task.id}")
+            logger.info(f"Triggering worker tasks for {len(uploaded_records)} record(s)")
+            result = group(
+                process_medical_record.s(record["id"], current_user.id)
+                for record in uploaded_records
+            ).apply_async()
+            logger.info(f"Worker tasks triggered successfully. Group ID: {result.id}")
         except Exception as e:
-            logger.error(f"Failed to trigger worker task for record {record.id}: {e}")
-
-        uploaded_records.append(
-            {
-                "id": str(record.id),
-                "file_name": record.file_name,
-                "file_type": record.file_type,
-                "created_at": record.created_at.isoformat(),
-            }
-        )
+            logger.error(f"Failed to trigger worker tasks: {e}")
+        else:
+            # Only queued records count towards progress, or it would never finish.
+            await stream_service.add_progress_total(current_user.id, len(uploaded_records))
 
     if is_initial_upload and uploaded_records:
         logger.info(
@@ -142,13 +336,18 @@ async def upload_files(
 
 @router.get("/records")
 async def list_medical_records(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
 ):
     """List all medical records for the current user."""
-    from sqlmodel import select
-
-    statement = select(MedicalRecord).where(MedicalRecord.user_id == current_user.id)
-    records = db.exec(statement).all()
+    statement = select(
+        MedicalRecord.id,
+        MedicalRecord.file_name,
+        MedicalRecord.file_type,
+        MedicalRecord.created_at,
+        MedicalRecord.processed_at,
+    ).where(MedicalRecord.user_id == current_user.id)
+    records = (await db.exec(statement)).all()
 
     return {
         "records": [
@@ -171,7 +370,7 @@ class DeleteRecordsRequest(BaseModel):
 @router.delete("/records")
 async def delete_records(
     request: DeleteRecordsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Delete multiple medical records."""
@@ -185,17 +384,19 @@ async def delete_records(
     if not records:
          raise HTTPException(status_code=404, detail="No records found to delete")
 
-    deleted_count = 0
+    storage_keys = {record.s3_key for record in records if record.s3_key}
     for record in records:
+        storage_keys.update(instance["s3_key"] for instance in record.series_instances or [])
+    for record in records:
+        db.delete(record)
+    db.commit()
+
+    # Blobs are content-addressed and may still be used by other records.
+    for storage_key in storage_keys:
         try:
-             if record.s3_key:
-                storage_service.delete_file(record.s3_key)
-             db.delete(record)
-             deleted_count += 1
+            if not is_blob_referenced(db, storage_key):
+                storage_service.delete_file(storage_key)
         except Exception as e:
-            logger.error(f"Failed to delete record {record.id}: {e}")
-            continue
-
-    db.commit()
+            logger.error(f"Failed to delete file {storage_key}: {e}")
 
-    return {"message": f"Successfully deleted {deleted_count} records"}
+    return {"message": f"Successfully deleted {len(records)} records"}
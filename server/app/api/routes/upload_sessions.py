@@ -0,0 +1,407 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlmodel import Session, select
+from sqlalchemy import exists, or_
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from uuid import UUID, uuid4
+import asyncio
+import mimetypes
+import logging
+import re
+import shutil
+from pydantic import BaseModel
+
+from app.api.deps import CurrentUser, get_current_user
+from app.api.routes.upload import get_file_type, is_blob_referenced
+from app.core.config import settings
+from app.core.db import engine, get_session
+from app.models import MedicalRecord, UploadSession
+from app.services.storage import CHUNK_SIZE, storage_service
+from app.services.stream_service import stream_service
+from app.worker import process_medical_record, run_analysis_job
+
+router = APIRouter(prefix="/api/upload/sessions", tags=["upload"])
+logger = logging.getLogger(__name__)
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class CreateUploadSessionRequest(BaseModel):
+    file_name: str
+    file_size: int
+    mime_type: str | None = None
+    sha256: str | None = None
+
+
+def session_status(upload: UploadSession) -> dict:
+    return {
+        "upload_id": str(upload.id),
+        "file_name": upload.file_name,
+        "file_size": upload.file_size,
+        "offset": upload.received_size,
+        "status": upload.status,
+        "record_id": str(upload.record_id) if upload.record_id else None,
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+    }
+
+
+def get_upload_session(db: Session, upload_id: UUID, user_id: str) -> UploadSession:
+    upload = db.exec(
+        select(UploadSession).where(
+            UploadSession.id == upload_id, UploadSession.user_id == user_id
+        )
+    ).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload
+
+
+def reset_upload(db: Session, upload: UploadSession, part_path: Path):
+    """Discard the received bytes so the client restarts from offset 0."""
+    part_path.write_bytes(b"")
+    upload.received_size = 0
+    upload.updated_at = datetime.now(UTC)
+    db.add(upload)
+    db.commit()
+
+
+def purge_expired_sessions(db: Session, user_id: str):
+    """Drop a user's open sessions (and their partial files) past the TTL."""
+    cutoff = datetime.now(UTC) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    expired = db.exec(
+        select(UploadSession).where(
+            UploadSession.user_id == user_id,
+            UploadSession.status == "open",
+            UploadSession.updated_at < cutoff,
+        )
+    ).all()
+    for upload in expired:
+        storage_service.upload_part_path(user_id, str(upload.id)).unlink(missing_ok=True)
+        db.delete(upload)
+    if expired:
+        db.commit()
+
+
+@router.post("")
+async def create_upload_session(
+    request: CreateUploadSessionRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
+):
+    """
+    Start a resumable upload. The client then PUTs byte ranges to the
+    session and calls /complete once every byte has been sent.
+    """
+    if request.file_size <= 0 or request.file_size > settings.UPLOAD_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size must be between 1 and {settings.UPLOAD_MAX_FILE_SIZE} bytes",
+        )
+
+    mime_type = (
+        request.mime_type
+        or mimetypes.guess_type(request.file_name)[0]
+        or "application/octet-stream"
+    )
+    try:
+        file_type = get_file_type(request.file_name, mime_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    purge_expired_sessions(db, current_user.id)
+
+    upload = UploadSession(
+        user_id=current_user.id,
+        file_name=request.file_name,
+        file_type=file_type,
+        mime_type=mime_type,
+        file_size=request.file_size,
+        expected_hash=request.sha256.lower() if request.sha256 else None,
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    storage_service.upload_part_path(current_user.id, str(upload.id)).touch()
+    logger.info(f"Created upload session {upload.id} for {request.file_name}")
+
+    return session_status(upload)
+
+
+@router.get("/{upload_id}")
+async def get_upload_status(
+    upload_id: UUID,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
+):
+    """Return how many bytes have been received, so a client can resume from there."""
+    return session_status(get_upload_session(db, upload_id, current_user.id))
+
+
+@router.put("/{upload_id}")
+async def upload_chunk(
+    upload_id: UUID,
+    request: Request,
+    content_range: str = Header(alias="Content-Range"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
+):
+    """
+    Append a byte range (`Content-Range: bytes start-end/total`) to an upload.
+
+    The range must start at the current offset; otherwise a 409 with the
+    offset is returned so the client can resume from the right byte. The
+    body is streamed to its own temporary file and only copied into the
+    upload once the offset is confirmed under the session's row lock.
+    """
+    upload = get_upload_session(db, upload_id, current_user.id)
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is already completed")
+
+    match = CONTENT_RANGE.fullmatch(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range header")
+    start, end, total = match.groups()
+    start, end = int(start), int(end)
+    if end < start or end >= upload.file_size or (total != "*" and int(total) != upload.file_size):
+        raise HTTPException(status_code=416, detail="Content-Range does not fit the upload")
+    if start != upload.received_size:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Range does not start at the current offset", "offset": upload.received_size},
+        )
+
+    expected = end - start + 1
+    part_path = storage_service.upload_part_path(current_user.id, str(upload.id))
+    chunk_path = part_path.with_name(f"{upload.id}.{uuid4()}.chunk")
+    written = 0
+    try:
+        # File I/O runs in worker threads; the body is buffered into
+        # CHUNK_SIZE writes so the event loop isn't blocked per network read.
+        f = await asyncio.to_thread(open, chunk_path, "wb")
+        try:
+            buffer = bytearray()
+            async for data in request.stream():
+                written += len(data)
+                if written > expected:
+                    break
+                buffer += data
+                if len(buffer) >= CHUNK_SIZE:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+        finally:
+            await asyncio.to_thread(f.close)
+        if written != expected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Expected {expected} bytes for this range, received {written}",
+            )
+
+        applied, status = await asyncio.to_thread(
+            append_chunk, upload.id, current_user.id, start, end, chunk_path
+        )
+    finally:
+        # Client went away mid-chunk, the range was rejected, or it was copied.
+        chunk_path.unlink(missing_ok=True)
+
+    if not applied:
+        if status["status"] != "open":
+            raise HTTPException(status_code=409, detail="Upload session is already completed")
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Range does not start at the current offset", "offset": status["offset"]},
+        )
+    return status
+
+
+def append_chunk(
+    upload_id: UUID, user_id: str, start: int, end: int, chunk_path: Path
+) -> tuple[bool, dict]:
+    """
+    Copy a received chunk into the part file and advance the offset.
+
+    The session row stays locked (FOR UPDATE) from the offset check until the
+    new offset is committed, so concurrent PUTs for the same upload are
+    applied one at a time and a rejected range never touches the part file.
+    Returns whether the chunk was applied, and the session status.
+    """
+    with Session(engine) as db:
+        upload = db.exec(
+            select(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+            .with_for_update()
+        ).first()
+        if not upload or upload.status != "open" or upload.received_size != start:
+            if not upload:
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            # Another request moved the offset; release the lock without writing.
+            status = session_status(upload)
+            db.rollback()
+            return False, status
+
+        part_path = storage_service.upload_part_path(user_id, str(upload_id))
+        with open(part_path, "r+b") as part, open(chunk_path, "rb") as chunk:
+            part.seek(start)
+            shutil.copyfileobj(chunk, part, CHUNK_SIZE)
+            part.truncate(end + 1)
+
+        upload.received_size = end + 1
+        upload.updated_at = datetime.now(UTC)
+        status = session_status(upload)
+        db.add(upload)
+        db.commit()
+        return True, status
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(
+    upload_id: UUID,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Verify a fully received upload, then create its MedicalRecord and queue
+    processing. Calling it again on a completed session returns the same record.
+    """
+    status, record_id, is_initial_upload = await asyncio.to_thread(
+        finish_upload, upload_id, current_user.id
+    )
+    if record_id is None:
+        return status
+
+    try:
+        logger.info(f"Triggering worker task for record {record_id}")
+        task = process_medical_record.delay(str(record_id), current_user.id)
+        logger.info(f"Worker task triggered successfully. Task ID: {task.id}")
+    except Exception as e:
+        logger.error(f"Failed to trigger worker task for record {record_id}: {e}")
+    else:
+        await stream_service.add_progress_total(current_user.id, 1)
+
+    if is_initial_upload:
+        logger.info(
+            f"Initial upload detected for user {current_user.id}. Triggering auto-analysis."
+        )
+        try:
+            run_analysis_job.delay(str(current_user.id), None)
+        except Exception as e:
+            logger.error(f"Failed to trigger auto-analysis: {e}")
+
+    return status
+
+
+def finish_upload(upload_id: UUID, user_id: str) -> tuple[dict, UUID | None, bool]:
+    """
+    Move a fully received upload into storage and create its MedicalRecord.
+
+    Runs under the session's row lock (FOR UPDATE), like append_chunk, so of
+    two concurrent completes only the first finalizes the part file; the
+    other waits and then sees the completed session. Returns the response
+    body, the id of the new record (None if nothing needs processing), and
+    whether it is the user's first record.
+    """
+    with Session(engine) as db:
+        upload = db.exec(
+            select(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+            .with_for_update()
+        ).first()
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if upload.status == "completed":
+            return session_status(upload), None, False
+        if upload.received_size != upload.file_size:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload is incomplete", "offset": upload.received_size},
+            )
+
+        part_path = storage_service.upload_part_path(user_id, str(upload.id))
+        if not part_path.exists() or part_path.stat().st_size != upload.file_size:
+            # The part file disagrees with the recorded offset; start the upload over.
+            reset_upload(db, upload, part_path)
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Received data does not match the upload size; the upload was reset", "offset": 0},
+            )
+        file_hash = None
+        if upload.expected_hash:
+            file_hash = storage_service.compute_file_hash(part_path)
+            if file_hash != upload.expected_hash:
+                # The bytes on disk are corrupt; start the upload over.
+                reset_upload(db, upload, part_path)
+                raise HTTPException(
+                    status_code=422,
+                    detail="SHA-256 of the received file does not match; the upload was reset",
+                )
+
+        is_initial_upload = not db.exec(
+            select(exists().where(MedicalRecord.user_id == user_id))
+        ).one()
+
+        stored = storage_service.finalize_upload(
+            part_path, upload.file_name, user_id, file_hash
+        )
+
+        duplicate = db.exec(
+            select(MedicalRecord.id, MedicalRecord.s3_key).where(
+                MedicalRecord.user_id == user_id,
+                or_(
+                    MedicalRecord.file_hash == stored.file_hash,
+                    (MedicalRecord.file_hash == None)  # noqa: E711
+                    & (MedicalRecord.file_name == upload.file_name),
+                ),
+            )
+        ).first()
+
+        if duplicate:
+            if duplicate.s3_key != stored.storage_key and not is_blob_referenced(
+                db, stored.storage_key
+            ):
+                storage_service.delete_file(stored.storage_key)
+            logger.info(f"Upload {upload.id} duplicates record {duplicate.id}, skipping")
+            upload.status = "completed"
+            upload.record_id = duplicate.id
+            upload.updated_at = datetime.now(UTC)
+            status = {**session_status(upload), "duplicate": True}
+            db.add(upload)
+            db.commit()
+            return status, None, False
+
+        record = MedicalRecord(
+            user_id=user_id,
+            file_name=upload.file_name,
+            file_type=upload.file_type,
+            s3_key=stored.storage_key,
+            mime_type=upload.mime_type,
+            file_hash=stored.file_hash,
+            file_size=stored.file_size,
+            processed_at=None,
+        )
+        upload.status = "completed"
+        upload.record_id = record.id
+        upload.updated_at = datetime.now(UTC)
+        status = {**session_status(upload), "duplicate": False}
+        record_id = record.id
+        db.add(record)
+        db.add(upload)
+        db.commit()
+        return status, record_id, is_initial_upload
+
+
+@router.delete("/{upload_id}")
+async def abort_upload(
+    upload_id: UUID,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_session),
+):
+    """Cancel an open upload and discard the bytes received so far."""
+    upload = get_upload_session(db, upload_id, current_user.id)
+    if upload.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is already completed")
+
+    storage_service.upload_part_path(current_user.id, str(upload.id)).unlink(missing_ok=True)
+    db.delete(upload)
+    db.commit()
+    return {"message": "Upload cancelled"}
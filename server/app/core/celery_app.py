@@ -20,12 +20,12 @@ celery_app = Celery(
 # }
 
 celery_app.conf.worker_pool = "gevent"
-celery_app.conf.worker_concurrency = 4
+celery_app.conf.worker_concurrency = settings.CELERY_WORKER_CONCURRENCY
 
 
 celery_app.conf.update(
     worker_pool="gevent",
-    worker_concurrency=4,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
     worker_prefetch_multiplier=1,
     task_acks_late=True,
     task_serializer="json",
@@ -43,8 +43,13 @@ def cleanup_on_worker_shutdown(sender=None, **kwargs):
     logger.info("Celery worker shutting down, cleaning up resources...")
     try:
         from app.core.utils import cleanup_model
+        from app.services.extraction_service import TextExtractionService
+
+        from app.services.stream_service import stream_service
 
         cleanup_model()
+        TextExtractionService.cleanup()
+        stream_service.flush_sync()
         logger.info("Successfully cleaned up model resources")
     except Exception as e:
         logger.error(f"Error during Celery worker cleanup: {e}")
@@ -56,8 +61,10 @@ def cleanup_on_process_shutdown(sender=None, **kwargs):
     logger.info("Celery worker process shutting down...")
     try:
         from app.core.utils import cleanup_model
+        from app.services.extraction_service import TextExtractionService
 
         cleanup_model()
+        TextExtractionService.cleanup()
         logger.info("Successfully cleaned up process resources")
     except Exception as e:
         logger.error(f"Error during process cleanup: {e}")
@@ -12,17 +12,67 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     ENCRYPTION_KEY: str #32 chars for AES-256
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
     PROJECT_NAME: str = "MedLM API"
 
     BACKEND_CORS_ORIGINS: list[str] | str
 
     STORAGE_DIR: str = "./storage/uploads"
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # suggested PUT size for resumable uploads
+    UPLOAD_MAX_FILE_SIZE: int = 2 * 1024 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+
+    DICOM_LAZY_PIXELS: bool = True  # decode one frame, window it and save a WebP pyramid
+    DICOM_THUMB_SIZE: int = 128
+    DICOM_MEDIUM_SIZE: int = 512
+    DICOM_WEBP_QUALITY: int = 80
+    DICOM_SERIES_INGEST: bool = True  # group uploaded slices into one record per series
+    DICOM_SERIES_PREVIEW_SLICES: int = 3
     EMBEDDING_MODEL: str = "Qwen/Qwen3-Embedding-0.6B"
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_KEY: str = ""
 
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_WORKER_CONCURRENCY: int = 4
+
+    PDF_PARALLEL_MIN_PAGES: int = 100
+    PDF_PARALLEL_PAGES_PER_CHUNK: int = 50
+    PDF_PARALLEL_WORKERS: int = 0  # 0 = os.cpu_count()
+
+    ANALYSIS_MAP_REDUCE_MIN_CHARS: int = 200_000
+    ANALYSIS_MAP_CHUNK_CHARS: int = 100_000
+    ANALYSIS_MAP_CONCURRENCY: int = 4
+    ANALYSIS_INCREMENTAL: bool = True
+    ANALYSIS_STAGE_CONCURRENCY: int = 3
+    ANALYSIS_CONCURRENT_MAX_CHARS: int = 500_000
+
+    SESSION_CACHE_TTL_SECONDS: int = 60
+    SESSION_CACHE_MAX_ENTRIES: int = 10_000
+    CACHE_REDIS_TIMEOUT_SECONDS: float = 0.5
+    CACHE_STATS_FLUSH_SECONDS: int = 30
+
+    LLM_MAX_CONCURRENCY: int = 8
+    SIMPLIFY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    SIMPLIFY_CACHE_MAX_ENTRIES: int = 1024
+
+    CLASSIFY_BATCH_WINDOW_MS: int = 500
+    CLASSIFY_BATCH_MAX_SIZE: int = 8
+    CLASSIFY_BATCH_MAX_CHARS: int = 60_000
+
+    STREAM_CLIENT_QUEUE_SIZE: int = 100
+    STREAM_BACKEND: str = "pubsub"  # pubsub, streams
+    STREAM_MAXLEN: int = 500
+    STREAM_TTL_SECONDS: int = 24 * 3600
+    STREAM_FLUSH_INTERVAL_MS: int = 250
+    STREAM_FLUSH_BATCH_SIZE: int = 100
+    STREAM_BUFFER_MAX: int = 10_000
+    STREAM_PUBLISH_TIMEOUT_SECONDS: float = 2.0
 
     GEMINI_API_KEY: str | None = None
     MEM_API_KEY: str | None = None
@@ -42,3 +42,26 @@ def decrypt_content(encrypted_blob: str) -> str:
         return decrypted.decode('utf-8')
     except Exception:
         return "[ENCRYPTION_ERROR or UNENCRYPTED_DATA]"
+
+def encrypt_bytes(data: bytes) -> str:
+    """
+    Encrypts raw bytes using AES-256-GCM.
+    Returns the same base64 "nonce+ciphertext" format as encrypt_content.
+    """
+    if not data:
+        return ""
+
+    nonce = os.urandom(12)
+    ciphertext = _aesgcm.encrypt(nonce, data, None)
+    return base64.b64encode(nonce + ciphertext).decode('utf-8')
+
+def decrypt_bytes(encrypted_blob: str) -> bytes:
+    """
+    Decrypts a base64 encoded "nonce+ciphertext" blob back into raw bytes.
+    Raises on tampered or unencrypted data so callers can fall back.
+    """
+    if not encrypted_blob:
+        return b""
+
+    data = base64.b64decode(encrypted_blob)
+    return _aesgcm.decrypt(data[:12], data[12:], None)
@@ -1,7 +1,35 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_engine(settings.DATABASE_URL, **pool_options)
+
+
+def async_database_url(url: str):
+    """
+    Point DATABASE_URL at asyncpg. libpq-only query options are translated
+    or dropped since asyncpg rejects them.
+    """
+    url = make_url(url)
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and sslmode != "disable":
+        query["ssl"] = sslmode
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), **pool_options)
 
 
 def init_db():
@@ -13,3 +41,10 @@ def get_session():
     """Dependency for database sessions."""
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """Dependency for async database sessions, for routes on the request hot path."""
+    # Objects stay readable after commit; lazy refreshes can't run under asyncio.
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
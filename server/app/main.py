@@ -4,13 +4,13 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.api.deps import get_current_user
-from app.models import User
+from app.api.deps import CurrentUser, get_current_user
 from app.core.config import settings
-from app.api.routes import upload, analysis, stream, chat, simplify
-from app.core.db import init_db
+from app.api.routes import upload, upload_sessions, analysis, stream, chat, simplify, session
+from app.core.db import init_db, async_engine
 from app.core.utils import cleanup_model
 from app.services.llm_service import llm_service
+from app.services.stream_service import stream_service
 
 
 logger = logging.getLogger(__name__)
@@ -24,6 +24,8 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down application...")
+    await stream_service.close()
+    await async_engine.dispose()
     cleanup_model()
     llm_service.cleanup()
 
@@ -94,14 +96,16 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 
 
 app.include_router(upload.router)
+app.include_router(upload_sessions.router)
 app.include_router(analysis.router)
 app.include_router(stream.router)
 app.include_router(chat.router)
 app.include_router(simplify.router)
+app.include_router(session.router)
 
 
 @app.get("/api/me")
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
 
@@ -1,7 +1,13 @@
 from datetime import datetime, UTC
 from typing import List, Optional
 from uuid import UUID, uuid4
-from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import BigInteger
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON, Index
+
+
+def utcnow() -> datetime:
+    """Current UTC time without tzinfo, as stored in the TIMESTAMP WITHOUT TIME ZONE columns."""
+    return datetime.now(UTC).replace(tzinfo=None)
 
 
 class User(SQLModel, table=True):
@@ -62,11 +68,14 @@ class Verification(SQLModel, table=True):
 
 class ChatSession(SQLModel, table=True):
     __tablename__ = "chat_session"
+    __table_args__ = (
+        Index("ix_chat_session_user_id_updated_at", "user_id", "updated_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     title: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
 
     user: User = Relationship(back_populates="chat_sessions")
     messages: List["ChatMessage"] = Relationship(
@@ -77,25 +86,37 @@ class ChatSession(SQLModel, table=True):
 
 class ChatMessage(SQLModel, table=True):
     __tablename__ = "chat_message"
+    __table_args__ = (
+        Index("ix_chat_message_session_id_created_at", "session_id", "created_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     session_id: UUID = Field(foreign_key="chat_session.id")
     user_id: str = Field(foreign_key="user.id")
     role: str  # user, ai, system
     content: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(default_factory=utcnow)
 
     session: ChatSession = Relationship(back_populates="messages")
 
 
 class MedicalRecord(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_medicalrecord_user_id_created_at", "user_id", "created_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     file_name: str
     file_type: str
     s3_key: str
     mime_type: str
+    file_hash: Optional[str] = Field(default=None, index=True)  # sha256 of the bytes at s3_key
+    file_size: Optional[int] = Field(default=None, sa_type=BigInteger)
+    series_uid: Optional[str] = Field(default=None, index=True)  # DICOM SeriesInstanceUID
+    series_hash: Optional[str] = None  # sha256 over the sorted slice hashes of a series
+    # Per-slice references of a DICOM series record, in series order
+    series_instances: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))
     processed_at: Optional[datetime] = None
-    extracted_images: List[str] = Field(default=[], sa_column=Column(JSON))
+    extracted_images: List[str] = Field(default=[], sa_column=Column(JSON))  # DICOM previews: thumb, medium, full
     summary: Optional[str] = None
     category: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -104,12 +125,16 @@ class MedicalRecord(SQLModel, table=True):
 
 
 class TimelineEvent(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_timelineevent_user_id_created_at", "user_id", "created_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
 
     analysis_summary: str
     timeline_summary: str
     analysis_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+    source_records: dict = Field(default={}, sa_column=Column(JSON))  # record_id -> file_hash
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -118,10 +143,14 @@ class TimelineEvent(SQLModel, table=True):
 
 
 class HealthTrend(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_healthtrend_user_id_created_at", "user_id", "created_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     trend_summary: str
     analysis_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+    source_records: dict = Field(default={}, sa_column=Column(JSON))  # record_id -> file_hash
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -130,12 +159,49 @@ class HealthTrend(SQLModel, table=True):
 
 
 class HealthVital(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_healthvital_user_id_created_at", "user_id", "created_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     analysis_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+    source_records: dict = Field(default={}, sa_column=Column(JSON))  # record_id -> file_hash
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
     user: User = Relationship(back_populates="health_vitals")
 
+
+class UploadSession(SQLModel, table=True):
+    __tablename__ = "upload_session"
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: str = Field(foreign_key="user.id", index=True)
+    file_name: str
+    file_type: str
+    mime_type: str
+    file_size: int = Field(sa_type=BigInteger)
+    received_size: int = Field(default=0, sa_type=BigInteger)
+    expected_hash: Optional[str] = None  # sha256 announced by the client
+    status: str = "open"  # open, completed
+    record_id: Optional[UUID] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class ExtractedText(SQLModel, table=True):
+    __tablename__ = "extracted_text"
+    file_hash: str = Field(primary_key=True)  # SHA-256 of the source file bytes
+    content: str  # zlib-compressed, AES-GCM encrypted text
+    char_count: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class RecordExtraction(SQLModel, table=True):
+    __tablename__ = "record_extraction"
+    file_hash: str = Field(primary_key=True)
+    kind: str = Field(primary_key=True)  # timeline, vitals
+    version: str = Field(primary_key=True)  # hash of the model and extraction prompt
+    summary: Optional[str] = None
+    analysis_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -0,0 +1,297 @@
+"""Map-reduce analysis over large record histories."""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, func, or_, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import RecordExtraction
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisService:
+    """
+    Runs timeline and vitals extraction per record (map) and merges the
+    results into one analysis (reduce).
+
+    Map outputs are cached in the record_extraction table by file content
+    hash and the version of the extraction prompt, so each document is only
+    sent to the LLM once per extraction kind until the model or prompt changes.
+    Documents are plain dicts with record_id, file_name, file_hash and text.
+    """
+
+    KINDS = ("timeline", "vitals")
+    SIGNATURES = {
+        "timeline": "TimelineAnalysisSignature",
+        "vitals": "VitalSignsAnalysisSignature",
+    }
+
+    def __init__(self):
+        # (file_hash, kind, version) -> Future, so concurrent stages share one map call
+        self._inflight: dict[tuple[str, str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def map_documents(self, documents: list[dict], kinds=KINDS) -> list[dict]:
+        """
+        Extract the requested kinds from every document in parallel.
+
+        Returns one dict per document (in input order) holding its record_id,
+        file_name, file_hash and a {"summary", "analysis_data"} entry per kind.
+        """
+        workers = max(1, settings.ANALYSIS_MAP_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda doc: self._map_document(doc, kinds), documents))
+
+    def has_extractions(self, documents: list[dict], kinds=KINDS) -> bool:
+        """Check, in one query, whether every document already has cached extractions of all kinds."""
+        hashes = {document["file_hash"] for document in documents}
+        if not hashes:
+            return True
+        with Session(engine) as db:
+            cached = db.exec(
+                select(func.count()).where(
+                    col(RecordExtraction.file_hash).in_(hashes),
+                    or_(
+                        *(
+                            (RecordExtraction.kind == kind)
+                            & (RecordExtraction.version == self.version(kind))
+                            for kind in kinds
+                        )
+                    ),
+                )
+            ).one()
+        return cached == len(hashes) * len(kinds)
+
+    def version(self, kind: str) -> str:
+        """Version of the prompt and model behind an extraction kind."""
+        return llm_service.signature_version(self.SIGNATURES[kind])
+
+    def _map_document(self, document: dict, kinds) -> dict:
+        mapped = {
+            "record_id": document["record_id"],
+            "file_name": document["file_name"],
+            "file_hash": document["file_hash"],
+        }
+        for kind in kinds:
+            try:
+                mapped[kind] = self._get_or_extract(document, kind)
+            except Exception as e:
+                logger.error(
+                    f"Map step '{kind}' failed for record {document['record_id']}: {e}"
+                )
+                mapped[kind] = {"summary": None, "analysis_data": []}
+        return mapped
+
+    def _get_or_extract(self, document: dict, kind: str) -> dict:
+        key = (document["file_hash"], kind, self.version(kind))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._lookup(*key)
+            if result is None:
+                if kind == "timeline":
+                    result = self._extract_timeline(document["text"])
+                else:
+                    result = self._extract_vitals(document["text"])
+                self._store(*key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _extract_timeline(self, text: str) -> dict:
+        summaries = []
+        events = []
+        for chunk in self._chunk_text(text):
+            prediction = llm_service.extract_timeline(chunk)
+            if prediction.overall_summary:
+                summaries.append(prediction.overall_summary)
+            events.extend(event.model_dump() for event in prediction.result or [])
+        return {"summary": "\n".join(summaries), "analysis_data": events}
+
+    def _extract_vitals(self, text: str) -> dict:
+        vitals = []
+        for chunk in self._chunk_text(text):
+            prediction = llm_service.analyze_vitals(chunk)
+            vitals.extend(vital.model_dump() for vital in prediction.analysis or [])
+        return {"summary": None, "analysis_data": vitals}
+
+    @staticmethod
+    def _chunk_text(text: str) -> list[str]:
+        """Split text into chunks of at most ANALYSIS_MAP_CHUNK_CHARS on line breaks."""
+        limit = settings.ANALYSIS_MAP_CHUNK_CHARS
+        if len(text) <= limit:
+            return [text]
+
+        chunks = []
+        start = 0
+        while start < len(text):
+            stop = min(start + limit, len(text))
+            if stop < len(text):
+                newline = text.rfind("\n", start, stop)
+                if newline > start:
+                    stop = newline + 1
+            chunks.append(text[start:stop])
+            start = stop
+        return chunks
+
+    def _lookup(self, file_hash: str, kind: str, version: str) -> dict | None:
+        with Session(engine) as db:
+            entry = db.get(RecordExtraction, (file_hash, kind, version))
+            if not entry:
+                return None
+            return {"summary": entry.summary, "analysis_data": entry.analysis_data or []}
+
+    def _store(self, file_hash: str, kind: str, version: str, result: dict):
+        with Session(engine) as db:
+            try:
+                db.merge(
+                    RecordExtraction(
+                        file_hash=file_hash,
+                        kind=kind,
+                        version=version,
+                        summary=result["summary"],
+                        analysis_data=result["analysis_data"],
+                    )
+                )
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+
+    @staticmethod
+    def merge_timeline_events(
+        mapped: list[dict], previous: list[dict] | None = None
+    ) -> list[dict]:
+        """
+        Merge per-record events, de-duplicating by date and description.
+        Events from a previous analysis can be passed in to merge new records
+        into an existing timeline.
+        """
+        merged = {}
+        for event in previous or []:
+            key = (
+                str(event.get("event_date", "")),
+                str(event.get("event", "")).strip().lower(),
+            )
+            merged.setdefault(
+                key, {**event, "record_ids": list(event.get("record_ids") or [])}
+            )
+
+        for doc in mapped:
+            for event in doc.get("timeline", {}).get("analysis_data", []):
+                key = (
+                    str(event.get("event_date", "")),
+                    str(event.get("event", "")).strip().lower(),
+                )
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = {**event, "record_ids": [doc["record_id"]]}
+                    continue
+
+                if doc["record_id"] not in existing["record_ids"]:
+                    existing["record_ids"].append(doc["record_id"])
+                existing["is_major"] = bool(existing.get("is_major") or event.get("is_major"))
+                existing["citation"] = existing.get("citation") or event.get("citation")
+
+        return sorted(merged.values(), key=lambda e: str(e.get("event_date", "")))
+
+    @staticmethod
+    def merge_vitals(mapped: list[dict], previous: list[dict] | None = None) -> list[dict]:
+        """
+        Merge per-record vitals by test name. Data points are de-duplicated by
+        date and value and tagged with the record they came from. Observations
+        and tips come from the record with the most recent measurement.
+        Vitals from a previous analysis can be passed in as the starting point.
+        """
+        merged = {}
+        latest = {}
+        for vital in previous or []:
+            name = str(vital.get("test_name", "")).strip()
+            if not name:
+                continue
+            key = name.lower()
+            merged[key] = {**vital, "data": list(vital.get("data") or [])}
+            latest[key] = max(
+                (str(p.get("date", "")) for p in merged[key]["data"] if isinstance(p, dict)),
+                default="",
+            )
+
+        for doc in mapped:
+            for vital in doc.get("vitals", {}).get("analysis_data", []):
+                name = str(vital.get("test_name", "")).strip()
+                if not name:
+                    continue
+                key = name.lower()
+
+                points = [
+                    {**point, "record_id": doc["record_id"]}
+                    for point in vital.get("data") or []
+                    if isinstance(point, dict)
+                ]
+                newest = max((str(p.get("date", "")) for p in points), default="")
+
+                entry = merged.setdefault(key, {**vital, "data": []})
+                entry["data"].extend(points)
+                if newest >= latest.get(key, ""):
+                    latest[key] = newest
+                    entry["observations"] = vital.get("observations", entry.get("observations"))
+                    entry["tips"] = vital.get("tips", entry.get("tips"))
+
+        for entry in merged.values():
+            seen = set()
+            unique = []
+            for point in sorted(entry["data"], key=lambda p: str(p.get("date", ""))):
+                point_key = (str(point.get("date")), str(point.get("value")))
+                if point_key not in seen:
+                    seen.add(point_key)
+                    unique.append(point)
+            entry["data"] = unique
+
+        return list(merged.values())
+
+    def summarize_timeline(
+        self, mapped: list[dict], events: list[dict], previous_summary: str | None = None
+    ):
+        """Reduce per-record summaries into overall and timeline summaries."""
+        summaries = [f"Previous analysis: {previous_summary}"] if previous_summary else []
+        summaries.extend(
+            f"{doc['file_name']}: {doc['timeline']['summary']}"
+            for doc in mapped
+            if doc.get("timeline", {}).get("summary")
+        )
+        return llm_service.summarize_timeline(
+            summaries, [f"{e.get('event_date')}: {e.get('event')}" for e in events]
+        )
+
+    def analyze_trends(self, events: list[dict], vitals: list[dict]):
+        """Run trend analysis over the condensed, merged map outputs."""
+        lines = ["--- Timeline events ---"]
+        lines.extend(f"{e.get('event_date')}: {e.get('event')}" for e in events)
+        lines.append("--- Vital signs and lab results ---")
+        for vital in vitals:
+            values = ", ".join(
+                f"{p.get('date')}={p.get('value')}" for p in vital.get("data", [])
+            )
+            lines.append(f"{vital.get('test_name')} ({vital.get('units', '')}): {values}")
+        return llm_service.analyze_trends("\n".join(lines))
+
+
+analysis_service = AnalysisService()
@@ -0,0 +1,178 @@
+"""Two-tier result caching: in-process TTL LRU in front of Redis."""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.crypto import encrypt_content, decrypt_content
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResultCache:
+    """
+    Caches JSON-serialisable results under a namespace.
+
+    Lookups hit the in-process TTLCache first and fall back to Redis, where
+    values are stored encrypted with the same key as chat content. Redis
+    errors are logged and treated as misses so the cache never fails a request.
+    Hit and miss counts are kept per process and added to a shared Redis
+    hash in the background every CACHE_STATS_FLUSH_SECONDS, so a local hit
+    never waits on Redis.
+    """
+
+    def __init__(self, namespace: str, ttl: int, maxsize: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis = redis.from_url(
+            settings.CELERY_BROKER_URL,
+            decode_responses=True,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+        self.hits = 0
+        self.misses = 0
+        self._pending: Counter = Counter()
+        self._flushed_at = time.monotonic()
+        self._flush_task: asyncio.Task | None = None
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+
+        try:
+            blob = await self.redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.error(f"Cache read failed for {self.namespace}: {e}")
+            blob = None
+
+        if blob:
+            try:
+                value = json.loads(decrypt_content(blob))
+            except ValueError:
+                value = _MISSING
+            if value is not _MISSING:
+                self.local.set(key, value)
+                self._count("redis_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    async def set(self, key: str, value, ttl: int | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self.local.set(key, value, ttl)
+        try:
+            await self.redis.set(
+                self._redis_key(key), encrypt_content(json.dumps(value)), ex=int(ttl)
+            )
+        except Exception as e:
+            logger.error(f"Cache write failed for {self.namespace}: {e}")
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        try:
+            await self.redis.delete(self._redis_key(key))
+        except Exception as e:
+            logger.error(f"Cache delete failed for {self.namespace}: {e}")
+
+    def _count(self, field: str):
+        if field == "misses":
+            self.misses += 1
+        else:
+            self.hits += 1
+        self._pending[field] += 1
+
+        now = time.monotonic()
+        if self._flush_task is None and now - self._flushed_at >= settings.CACHE_STATS_FLUSH_SECONDS:
+            self._flushed_at = now
+            self._flush_task = asyncio.create_task(self._flush_in_background())
+
+    async def _flush_in_background(self):
+        try:
+            await self._flush_stats()
+        finally:
+            self._flush_task = None
+
+    async def _flush_stats(self):
+        """Add the counts gathered since the last flush to the shared hash."""
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for field, count in pending.items():
+                    pipe.hincrby(f"cache:{self.namespace}:stats", field, count)
+                await pipe.execute()
+        except Exception:
+            # Statistics are best effort; the counts are dropped.
+            pass
+
+    async def stats(self) -> dict:
+        """Return this process's counters and the shared counters from Redis."""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._flush_stats()
+        try:
+            shared = await self.redis.hgetall(f"cache:{self.namespace}:stats")
+        except Exception:
+            shared = {}
+        return {
+            "process": {"hits": self.hits, "misses": self.misses, "size": len(self.local)},
+            "shared": {k: int(v) for k, v in shared.items()},
+        }
@@ -1,36 +1,49 @@
 import pydicom
+from pydicom.multival import MultiValue
+from pydicom.pixels import apply_modality_lut, apply_voi_lut, pixel_array as read_pixel_array
 from PIL import Image
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Any
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+SERIES_TAGS = [
+    "StudyInstanceUID",
+    "SeriesInstanceUID",
+    "SOPInstanceUID",
+    "InstanceNumber",
+    "ImagePositionPatient",
+    "ImageOrientationPatient",
+    "SeriesDescription",
+    "Modality",
+]
+
 class DicomService:
     def process_dicom(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
         """
         Read a DICOM file, extract metadata, and save a representative image.
-        
+
         Args:
             file_path: Path to the .dcm file
             output_dir: Directory to save the extracted image
-            
+
         Returns:
             Dictionary containing metadata and path to the extracted image
         """
+        if settings.DICOM_LAZY_PIXELS:
+            return self._process_lazy(file_path, output_dir)
+
         try:
             ds = pydicom.dcmread(file_path)
-            
-            metadata = {
-                "patient_id": str(ds.get("PatientID", "unknown")),
-                "study_date": str(ds.get("StudyDate", "unknown")),
-                "modality": str(ds.get("Modality", "unknown")),
-                "description": str(ds.get("StudyDescription", "unknown")),
-            }
-            
+
+            metadata = self._read_metadata(ds)
+
             pixel_array = ds.pixel_array
-            
+
             if pixel_array.ndim == 2:
                 image_2d = pixel_array.astype(float)
                 image_2d = (np.maximum(image_2d, 0) / image_2d.max()) * 255.0
@@ -39,7 +52,7 @@ class DicomService:
             elif pixel_array.ndim == 3:
                 if pixel_array.shape[0] < 50: # Likely frames
                     image_2d = pixel_array[0].astype(float)
-                else: 
+                else:
                      image_2d = pixel_array.astype(float)
 
                 image_2d = (np.maximum(image_2d, 0) / image_2d.max()) * 255.0
@@ -51,14 +64,268 @@ class DicomService:
             image_name = f"{file_path.stem}.jpg"
             image_save_path = output_dir / image_name
             img.save(image_save_path)
-            
+
             return {
                 "metadata": metadata,
                 "image_path": str(image_name) # Relative to user storage
             }
-            
+
         except Exception as e:
             logger.error(f"Error processing DICOM {file_path}: {e}")
             raise e
 
+    def _process_lazy(self, file_path: Path, output_dir: Path) -> Dict[str, Any]:
+        """
+        Decode only the header and a single frame, window it for display and
+        save it as a WebP pyramid (thumbnail, medium, full).
+
+        Returns:
+            Dictionary with metadata, "images" (pyramid file names, smallest
+            first) and "image_path" (the full-size image)
+        """
+        try:
+            metadata, images = self._render(file_path, output_dir)
+            if images is None:
+                return {"metadata": metadata, "error": "Unsupported dimensions"}
+
+            return {
+                "metadata": metadata,
+                "images": images, # Relative to user storage
+                "image_path": images[-1],
+            }
+
+        except Exception as e:
+            logger.error(f"Error processing DICOM {file_path}: {e}")
+            raise e
+
+    def read_instance_header(self, file_path: Path) -> Dict[str, Any] | None:
+        """
+        Read the tags needed to group and order a slice, without pixel data.
+
+        Returns:
+            Dictionary with study/series/SOP UIDs, instance number, position
+            along the slice normal, description and modality, or None if the
+            file is not a readable DICOM instance with a series UID
+        """
+        try:
+            ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=SERIES_TAGS)
+        except Exception as e:
+            logger.warning(f"Could not read DICOM header of {file_path}: {e}")
+            return None
+
+        series_uid = str(ds.get("SeriesInstanceUID", "") or "")
+        if not series_uid:
+            return None
+
+        instance_number = ds.get("InstanceNumber")
+        return {
+            "study_uid": str(ds.get("StudyInstanceUID", "") or ""),
+            "series_uid": series_uid,
+            "sop_uid": str(ds.get("SOPInstanceUID", "") or ""),
+            "instance_number": int(instance_number) if instance_number not in (None, "") else None,
+            "position": self._slice_position(ds),
+            "description": str(ds.get("SeriesDescription", "") or ""),
+            "modality": str(ds.get("Modality", "") or ""),
+        }
+
+    @staticmethod
+    def _slice_position(ds) -> float | None:
+        """Project ImagePositionPatient onto the slice normal, giving a sortable position."""
+        position = ds.get("ImagePositionPatient")
+        orientation = ds.get("ImageOrientationPatient")
+        if not position or not orientation or len(orientation) != 6:
+            return None
+        row = np.array(orientation[:3], dtype=float)
+        column = np.array(orientation[3:], dtype=float)
+        return float(np.dot(np.cross(row, column), np.array(position, dtype=float)))
+
+    @staticmethod
+    def sort_instances(instances: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order slices by position when every slice has one, else by instance number."""
+        if instances and all(i.get("position") is not None for i in instances):
+            return sorted(instances, key=lambda i: i["position"])
+        return sorted(
+            instances,
+            key=lambda i: (i.get("instance_number") is None, i.get("instance_number") or 0),
+        )
+
+    @staticmethod
+    def representative_indices(count: int) -> List[int]:
+        """Evenly spaced slice indices (first, middle, last, ...), always including the middle."""
+        if count <= 0:
+            return []
+        wanted = max(1, settings.DICOM_SERIES_PREVIEW_SLICES)
+        indices = {int(round(i)) for i in np.linspace(0, count - 1, min(wanted, count))}
+        indices.add(count // 2)
+        return sorted(indices)
+
+    def process_series(self, file_paths: List[Path], output_dir: Path) -> Dict[str, Any]:
+        """
+        Render previews for the representative slices of a sorted series.
+        Only those slices are decoded; the rest are never read.
+
+        Args:
+            file_paths: Paths of the slices, in series order
+            output_dir: Directory to save the extracted images
+
+        Returns:
+            Dictionary with metadata of the middle (key) slice, "images" (its
+            pyramid) and "previews" mapping slice index to its pyramid
+        """
+        key_index = len(file_paths) // 2
+        previews = {}
+        metadata = {}
+        for index in self.representative_indices(len(file_paths)):
+            try:
+                slice_metadata, images = self._render(file_paths[index], output_dir)
+            except Exception as e:
+                logger.error(f"Error processing DICOM slice {file_paths[index]}: {e}")
+                continue
+            if images is None:
+                continue
+            previews[index] = images
+            if index == key_index:
+                metadata = slice_metadata
+
+        if not previews:
+            raise ValueError("No slice of the series could be rendered")
+
+        images = previews.get(key_index) or next(iter(previews.values()))
+        return {"metadata": metadata, "images": images, "previews": previews}
+
+    def _render(self, file_path: Path, output_dir: Path):
+        """Decode one frame, window it and save its pyramid. Returns (metadata, images or None)."""
+        ds = pydicom.dcmread(file_path, stop_before_pixels=True)
+        metadata = self._read_metadata(ds)
+
+        frame = self._read_frame(file_path, ds)
+        if frame.ndim not in (2, 3):
+            return metadata, None
+
+        if int(ds.get("SamplesPerPixel", 1) or 1) > 1:
+            pixels = self._to_uint8(frame)
+        else:
+            pixels = self._apply_windowing(frame, ds)
+
+        return metadata, self._save_pyramid(Image.fromarray(pixels), file_path.stem, output_dir)
+
+    @staticmethod
+    def _read_metadata(ds) -> Dict[str, str]:
+        return {
+            "patient_id": str(ds.get("PatientID", "unknown")),
+            "study_date": str(ds.get("StudyDate", "unknown")),
+            "modality": str(ds.get("Modality", "unknown")),
+            "description": str(ds.get("StudyDescription", "unknown")),
+        }
+
+    @staticmethod
+    def _read_frame(file_path: Path, ds) -> np.ndarray:
+        """Decode only the middle frame of a (possibly multi-frame) image."""
+        frames = int(ds.get("NumberOfFrames", 1) or 1)
+        index = frames // 2 if frames > 1 else None
+        return read_pixel_array(file_path, index=index)
+
+    def _apply_windowing(self, frame: np.ndarray, ds) -> np.ndarray:
+        """
+        Map stored values to 8-bit display values through the modality LUT
+        (rescale slope/intercept or LUT sequence) and the VOI window, then
+        invert MONOCHROME1 so that higher values are always brighter.
+
+        For 8/16-bit data the transform is evaluated once per possible
+        stored value into a uint8 LUT, and the frame is mapped with a single
+        indexing pass. Other dtypes are transformed directly.
+        """
+        if frame.dtype.itemsize <= 2 and frame.dtype.kind in "ui":
+            bits = frame.dtype.itemsize * 8
+            if frame.dtype.kind == "i":
+                domain = np.arange(-(1 << (bits - 1)), 1 << (bits - 1), dtype=np.int32)
+                # Flipping the sign bit maps signed values onto LUT offsets in order.
+                index = frame.view(np.dtype(f"u{frame.dtype.itemsize}"))
+                index ^= 1 << (bits - 1)
+            else:
+                domain = np.arange(1 << bits, dtype=np.int32)
+                index = frame
+            lut = self._transfer(domain, ds, int(domain[index.min()]), int(domain[index.max()]))
+            return lut[index]
+
+        return self._transfer(frame, ds, frame.min(), frame.max())
+
+    @staticmethod
+    def _transfer(values: np.ndarray, ds, low, high) -> np.ndarray:
+        """Apply the display transform to an array of stored values; low/high bound the values in use."""
+        values = np.asarray(apply_modality_lut(values, ds), dtype=np.float32)
+        used = np.asarray(apply_modality_lut(np.array([low, high]), ds), dtype=np.float32)
+
+        center = ds.get("WindowCenter")
+        width = ds.get("WindowWidth")
+        if center is not None and width is not None:
+            # First window when several are defined (MultiValue).
+            center = float(center[0] if isinstance(center, MultiValue) else center)
+            width = float(width[0] if isinstance(width, MultiValue) else width)
+
+        if center is not None and width is not None and width >= 1:
+            # DICOM PS3.3 C.11.2.1.2 linear window
+            values -= center - 0.5
+            values /= max(width - 1, 1)
+            values += 0.5
+        else:
+            if "VOILUTSequence" in ds:
+                # VOI LUTs are indexed by (integer) modality output values.
+                values = np.asarray(apply_voi_lut(np.rint(values).astype(np.int64), ds), dtype=np.float32)
+                used = np.asarray(apply_voi_lut(np.rint(used).astype(np.int64), ds), dtype=np.float32)
+            low, high = float(used.min()), float(used.max())
+            values -= low
+            values /= max(high - low, 1e-6)
+
+        np.clip(values, 0.0, 1.0, out=values)
+        values *= 255.0
+        if ds.get("PhotometricInterpretation") == "MONOCHROME1":
+            np.subtract(255.0, values, out=values)
+        return values.astype(np.uint8)
+
+    @staticmethod
+    def _save_pyramid(img: Image.Image, stem: str, output_dir: Path) -> List[str]:
+        """Save thumbnail, medium and full-size WebP previews; returns file names, smallest first."""
+        levels = [
+            (f"{stem}_thumb.webp", settings.DICOM_THUMB_SIZE),
+            (f"{stem}_medium.webp", settings.DICOM_MEDIUM_SIZE),
+            (f"{stem}.webp", None),
+        ]
+        names = []
+        for name, size in levels:
+            level = img
+            if size:
+                level = img.copy()
+                level.thumbnail((size, size), Image.Resampling.LANCZOS)
+            level.save(output_dir / name, "WEBP", quality=settings.DICOM_WEBP_QUALITY)
+            names.append(name)
+        return names
+
+    @staticmethod
+    def _to_uint8(frame: np.ndarray) -> np.ndarray:
+        """
+        Scale [0, max] to [0, 255] without a float copy. Negative values are
+        clipped in place; small ranges go through a uint8 lookup table and
+        wide ones are bit-shifted down.
+        """
+        if frame.dtype.kind in "if":
+            np.maximum(frame, 0, out=frame)
+        peak = frame.max()
+        if peak <= 0:
+            return np.zeros(frame.shape, dtype=np.uint8)
+        if frame.dtype.kind == "f":
+            frame *= 255.0 / peak
+            return frame.astype(np.uint8)
+
+        peak = int(peak)
+        if frame.dtype == np.uint8 and peak == 255:
+            return frame
+
+        if peak < 1 << 16:
+            lut = (np.arange(peak + 1, dtype=np.uint32) * 255 // peak).astype(np.uint8)
+            return lut[frame]
+
+        np.right_shift(frame, peak.bit_length() - 8, out=frame)
+        return frame.astype(np.uint8)
+
 dicom_service = DicomService()
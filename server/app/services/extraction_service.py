@@ -2,12 +2,52 @@ from typing_extensions import Text
 import fitz  # PyMuPDF
 from pathlib import Path
 import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from docx import Document
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _extract_pdf_page_range(file_path: str, start: int, stop: int) -> str:
+    """Extract text from pages [start, stop) of a PDF. Runs in a worker process."""
+    with fitz.open(file_path) as doc:
+        return "".join(doc[i].get_text() for i in range(start, stop))
+
+
 class TextExtractionService:
+    DOCX_BLOCK_CHARS = 4000
+    TXT_BLOCK_LINES = 200
+
+    _pdf_pool = None
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def _get_pdf_pool(cls) -> ProcessPoolExecutor:
+        if cls._pdf_pool is None:
+            with cls._pool_lock:
+                if cls._pdf_pool is None:
+                    workers = settings.PDF_PARALLEL_WORKERS or os.cpu_count() or 1
+                    # spawn rather than fork: the Celery worker is gevent
+                    # monkey-patched and forked children would inherit its hub.
+                    cls._pdf_pool = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    logger.info(f"PDF extraction pool started with {workers} workers")
+        return cls._pdf_pool
+
+    @classmethod
+    def cleanup(cls):
+        if cls._pdf_pool is not None:
+            logger.info("Shutting down PDF extraction pool...")
+            cls._pdf_pool.shutdown(wait=False, cancel_futures=True)
+            cls._pdf_pool = None
+
     @staticmethod
     def extract_text(file_path: Path) -> str:
         """
@@ -28,13 +68,96 @@ class TextExtractionService:
             logger.error(f"Error extracting text from {file_path}: {e}")
             raise e
 
+    @staticmethod
+    def iter_text(file_path: Path) -> Iterator[tuple[int, str]]:
+        """
+        Lazily yield (chunk_number, text) pairs from a PDF, TXT, or DOCX file.
+
+        PDFs yield one chunk per page (1-based page numbers), DOCX files yield
+        blocks of whole paragraphs and TXT files yield blocks of lines, so
+        callers can start work before the whole document has been read.
+        Joining every chunk gives the same result as extract_text.
+        """
+        suffix = file_path.suffix.lower()
+
+        if suffix == ".pdf":
+            yield from TextExtractionService._iter_pdf_pages(file_path)
+        elif suffix == ".txt":
+            yield from TextExtractionService._iter_txt_blocks(file_path)
+        elif suffix == ".docx":
+            yield from TextExtractionService._iter_docx_blocks(file_path)
+        else:
+            raise ValueError(f"Unsupported file type: {suffix}")
+
+    @staticmethod
+    def _iter_pdf_pages(file_path: Path) -> Iterator[tuple[int, str]]:
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                yield page.number + 1, page.get_text()
+
+    @staticmethod
+    def _iter_txt_blocks(file_path: Path) -> Iterator[tuple[int, str]]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            block_number = 0
+            lines = []
+            for line in f:
+                lines.append(line)
+                if len(lines) >= TextExtractionService.TXT_BLOCK_LINES:
+                    block_number += 1
+                    yield block_number, "".join(lines)
+                    lines = []
+            if lines:
+                yield block_number + 1, "".join(lines)
+
+    @staticmethod
+    def _iter_docx_blocks(file_path: Path) -> Iterator[tuple[int, str]]:
+        doc = Document(file_path)
+        block_number = 0
+        paragraphs = []
+        size = 0
+        for para in doc.paragraphs:
+            paragraphs.append(para.text + "\n")
+            size += len(para.text) + 1
+            if size >= TextExtractionService.DOCX_BLOCK_CHARS:
+                block_number += 1
+                yield block_number, "".join(paragraphs)
+                paragraphs = []
+                size = 0
+        if paragraphs:
+            yield block_number + 1, "".join(paragraphs)
+
     @staticmethod
     def _extract_from_pdf(file_path: Path) -> str:
-        doc = fitz.open(file_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        with fitz.open(file_path) as doc:
+            page_count = doc.page_count
+        if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+            return "".join(
+                text for _, text in TextExtractionService._iter_pdf_pages(file_path)
+            )
+
+        return TextExtractionService._extract_from_pdf_parallel(file_path, page_count)
+
+    @staticmethod
+    def _extract_from_pdf_parallel(file_path: Path, page_count: int) -> str:
+        """
+        Split a large PDF into page ranges and extract them in a process pool.
+        Results are joined in page order.
+        """
+        chunk = max(1, settings.PDF_PARALLEL_PAGES_PER_CHUNK)
+        ranges = [
+            (start, min(start + chunk, page_count))
+            for start in range(0, page_count, chunk)
+        ]
+        logger.info(
+            f"Extracting {page_count} pages from {file_path.name} in {len(ranges)} parallel chunks"
+        )
+
+        pool = TextExtractionService._get_pdf_pool()
+        futures = [
+            pool.submit(_extract_pdf_page_range, str(file_path), start, stop)
+            for start, stop in ranges
+        ]
+        return "".join(future.result() for future in futures)
 
     @staticmethod
     def _extract_from_txt(file_path: Path) -> str:
@@ -43,11 +166,9 @@ class TextExtractionService:
 
     @staticmethod
     def _extract_from_docx(file_path: Path) -> str:
-        doc = Document(file_path)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
+        return "".join(
+            text for _, text in TextExtractionService._iter_docx_blocks(file_path)
+        )
 
 
 pdf_service = TextExtractionService()
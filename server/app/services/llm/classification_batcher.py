@@ -0,0 +1,104 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationBatcher:
+    """
+    Collects classify_and_summarize requests for a short window and sends
+    them to the LLM as one multi-document prompt.
+
+    Callers block on classify() until their batch has been processed, so
+    each Celery task still gets its own result back. A batch is flushed
+    when the window expires or when it reaches CLASSIFY_BATCH_MAX_SIZE.
+    If the batched call fails, its documents are classified one at a time.
+    """
+
+    def __init__(self):
+        self._pending: list[tuple[str, Future]] = []
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def classify(self, document_text: str):
+        """Classify and summarize a document. Returns an object with category and summary."""
+        future = Future()
+        batch = None
+
+        with self._lock:
+            self._pending.append((document_text, future))
+            if len(self._pending) >= settings.CLASSIFY_BATCH_MAX_SIZE:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(
+                    settings.CLASSIFY_BATCH_WINDOW_MS / 1000, self.flush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._run(batch)
+        return future.result()
+
+    def flush(self):
+        """Process every pending request now."""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._run(batch)
+
+    def _take_pending(self) -> list[tuple[str, Future]]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _run(self, batch: list[tuple[str, Future]]):
+        for group in self._split(batch):
+            if len(group) == 1:
+                self._run_single(*group[0])
+                continue
+
+            try:
+                logger.info(f"Classifying {len(group)} documents in one batch")
+                results = llm_service.classify_and_summarize_batch(
+                    [text for text, _ in group]
+                )
+                for (_, future), result in zip(group, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batch classification failed, falling back: {e}")
+                for text, future in group:
+                    self._run_single(text, future)
+
+    def _run_single(self, text: str, future: Future):
+        try:
+            future.set_result(llm_service.classify_and_summarize(text))
+        except Exception as e:
+            future.set_exception(e)
+
+    @staticmethod
+    def _split(batch: list[tuple[str, Future]]) -> list[list[tuple[str, Future]]]:
+        """Group requests so no multi-document prompt exceeds CLASSIFY_BATCH_MAX_CHARS."""
+        groups = []
+        current = []
+        size = 0
+        for item in batch:
+            length = len(item[0])
+            if current and size + length > settings.CLASSIFY_BATCH_MAX_CHARS:
+                groups.append(current)
+                current = []
+                size = 0
+            current.append(item)
+            size += length
+        if current:
+            groups.append(current)
+        return groups
+
+
+classification_batcher = ClassificationBatcher()
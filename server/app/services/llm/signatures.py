@@ -72,6 +72,28 @@ class TimelineAnalysisSignature(dspy.Signature):
     )
 
 
+class TimelineSummarySignature(dspy.Signature):
+    """
+    You are MedLM, an expert medical AI assistant.
+    Your task is to combine per-document clinical summaries and an already merged, chronological list of health events
+    into one overall narrative of the patient's history. Do not invent events that are not listed.
+    """
+
+    record_summaries: list[str] = dspy.InputField(
+        desc="Per-document summaries of the patient's clinical history, one entry per record."
+    )
+    events: list[str] = dspy.InputField(
+        desc="Merged chronological health events, formatted as 'YYYY-MM-DD: event'."
+    )
+    overall_summary: str = dspy.OutputField(
+        desc="A comprehensive narrative summary of the patient's overall clinical history based on the records."
+    )
+    timeline_summary: str = dspy.OutputField(
+        desc="A concise summary of the timeline findings, highlighting the most critical events.",
+        max_length=500,
+    )
+
+
 class TrendAnalysisSignature(dspy.Signature):
     """
     You are MedLM, an expert medical AI assistant.
@@ -210,3 +232,32 @@ class DocumentClassificationSignature(dspy.Signature):
         desc="A concise summary of the document's key information (diagnoses, results, plans), max 500 characters.",
         max_length=500,
     )
+
+
+class DocumentClassificationOutput(dspy.Signature):
+    document_index: int = dspy.OutputField(
+        desc="The index of the document in the input list this classification belongs to."
+    )
+    category: str = dspy.OutputField(
+        desc="The category of the document. Options: 'Lab Report', 'Clinical Note', 'Imaging Report', 'Prescription', 'Other'."
+    )
+    summary: str = dspy.OutputField(
+        desc="A concise summary of the document's key information (diagnoses, results, plans), max 500 characters.",
+        max_length=500,
+    )
+
+
+class BatchDocumentClassificationSignature(dspy.Signature):
+    """
+    You are MedLM, an expert medical AI assistant.
+    Your task is to analyze several independent medical documents and classify each one into a specific category.
+    Also, provide a concise, high-quality summary of each document's contents.
+    Treat every document separately and never mix information between documents.
+    """
+
+    documents: list[str] = dspy.InputField(
+        desc="The extracted text content of each medical document, in order. Each entry is prefixed with its index."
+    )
+    results: list[DocumentClassificationOutput] = dspy.OutputField(
+        desc="Exactly one classification per input document, with document_index matching the input position."
+    )
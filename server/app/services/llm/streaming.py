@@ -0,0 +1,29 @@
+from dspy.streaming import StatusMessageProvider
+
+
+class ChatStatusMessageProvider(StatusMessageProvider):
+    """
+    Status messages streamed to the chat client while the ReAct agent works.
+    Messages start with "Thinking..." so the chat route emits them as status events.
+    """
+
+    def tool_start_status_message(self, instance, inputs):
+        target = (inputs or {}).get("file_name_or_id")
+        if target:
+            return f"Thinking... Reading {target}"
+        return f"Thinking... Calling {instance.name}"
+
+    def tool_end_status_message(self, outputs):
+        return "Thinking... Reviewing the document"
+
+    def lm_start_status_message(self, instance, inputs):
+        return None
+
+    def lm_end_status_message(self, outputs):
+        return None
+
+    def module_start_status_message(self, instance, inputs):
+        return None
+
+    def module_end_status_message(self, outputs):
+        return None
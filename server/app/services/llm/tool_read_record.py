@@ -5,7 +5,7 @@ from sqlmodel import Session, select
 from app.core.db import engine
 from app.models import MedicalRecord
 from app.services.storage import storage_service
-from app.services.extraction_service import TextExtractionService
+from app.services.text_cache_service import text_cache_service
 
 logger = logging.getLogger(__name__)
 class ReadMedicalRecord:
@@ -52,7 +52,7 @@ class ReadMedicalRecord:
 
             try:
                 file_path = storage_service.get_file_path(record.s3_key)
-                text = TextExtractionService.extract_text(file_path) # TODO: Change to use Attachment 
+                text = text_cache_service.get_text(file_path, record.file_hash) # TODO: Change to use Attachment 
                 
                 if not text:
                     return "The document was found but contains no extractable text."
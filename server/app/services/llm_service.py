@@ -1,15 +1,22 @@
 import asyncio
+import contextvars
+import hashlib
 import logging
 import threading
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from app.core.config import settings
+from app.services.cache_service import ResultCache
 from .llm.memory_service import memory_service
 
 logger = logging.getLogger(__name__)
 
 
 class LLMService:
+    MODEL = "gemini/gemini-3-flash-preview"
+
     _lm = None
     _timeline_predictor = None
     _trend_predictor = None
@@ -17,6 +24,11 @@ class LLMService:
     _text_simplification_predictor = None
     _document_classifier_predictor = None
     _vital_signs_predictor = None
+    _timeline_summary_predictor = None
+    _batch_classifier_predictor = None
+    _executor = None
+    _simplify_cache = None
+    _signature_versions: dict[str, str] = {}
     _init_lock = threading.Lock()
 
     @classmethod
@@ -32,10 +44,12 @@ class LLMService:
                         TextSimplificationSignature,
                         DocumentClassificationSignature,
                         VitalSignsAnalysisSignature,
+                        TimelineSummarySignature,
+                        BatchDocumentClassificationSignature,
                     )
 
                     cls._lm = dspy.LM(
-                        model="gemini/gemini-3-flash-preview",
+                        model=cls.MODEL,
                         api_key=settings.GEMINI_API_KEY,
                         temperature=0.3,
                         cache=True,
@@ -58,6 +72,12 @@ class LLMService:
                     cls._vital_signs_predictor = dspy.Predict(
                         VitalSignsAnalysisSignature
                     )
+                    cls._timeline_summary_predictor = dspy.Predict(
+                        TimelineSummarySignature
+                    )
+                    cls._batch_classifier_predictor = dspy.Predict(
+                        BatchDocumentClassificationSignature
+                    )
 
     def __init__(self):
         self.memory_service = memory_service
@@ -69,8 +89,34 @@ class LLMService:
             self._initialize_dspy()
             self._initialized = True
 
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._init_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.LLM_MAX_CONCURRENCY,
+                        thread_name_prefix="llm",
+                    )
+        return cls._executor
+
+    async def _run_async(self, fn, *args, **kwargs):
+        """
+        Run a blocking LLM call on the bounded executor so it never blocks the
+        event loop. At most LLM_MAX_CONCURRENCY calls run at once per process;
+        the rest queue without holding the loop.
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._get_executor(), partial(ctx.run, fn, *args, **kwargs)
+        )
+
     @classmethod
     def cleanup(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
         if cls._lm:
             logger.info("Cleaning up LLM service resources...")
             cls._lm = None
@@ -80,6 +126,8 @@ class LLMService:
             cls._text_simplification_predictor = None
             cls._document_classifier_predictor = None
             cls._vital_signs_predictor = None
+            cls._timeline_summary_predictor = None
+            cls._batch_classifier_predictor = None
 
             logger.info("LLM service resources cleaned up")
 
@@ -112,19 +160,44 @@ class LLMService:
 
             from .llm.tool_read_record import ReadMedicalRecord
             from .llm.signatures import ChatMedLm
+            from .llm.streaming import ChatStatusMessageProvider
             import dspy
+            from dspy.streaming import StatusMessage, StreamListener, StreamResponse
 
             read_tool = ReadMedicalRecord(user_id=user_id)
 
             react_agent = dspy.ReAct(ChatMedLm, tools=[read_tool])
 
-            def run_agent():
-                with dspy.context(lm=self._lm):
-                    return react_agent(context=formatted_context, user_input=message)
+            # Stream the final answer field token by token, plus tool status.
+            stream_agent = dspy.streamify(
+                react_agent,
+                stream_listeners=[StreamListener(signature_field_name="response")],
+                status_message_provider=ChatStatusMessageProvider(),
+                async_streaming=True,
+            )
 
+            streamed = False
             try:
-                prediction = await asyncio.to_thread(run_agent)
-                response_text = prediction.response
+                prediction = None
+                with dspy.context(lm=self._lm):
+                    async for value in stream_agent(
+                        context=formatted_context, user_input=message
+                    ):
+                        if isinstance(value, StreamResponse):
+                            if value.chunk:
+                                streamed = True
+                                response_text += value.chunk
+                                yield value.chunk
+                        elif isinstance(value, StatusMessage):
+                            yield value.message
+                        elif isinstance(value, dspy.Prediction):
+                            prediction = value
+
+                # Cached LM responses arrive without token chunks.
+                if not streamed and prediction is not None:
+                    response_text = prediction.response
+                    yield response_text
+
                 msg = [
                     {"role": "user", "content": message},
                     {"role": "assistant", "content": response_text},
@@ -133,13 +206,13 @@ class LLMService:
                     "source": "chat_medlm",
                     "timestamp": datetime.now().isoformat(),
                 }
-                self.memory_service.add_memory(msg, user_id, metadata)
+                await asyncio.to_thread(
+                    self.memory_service.add_memory, msg, user_id, metadata
+                )
             except Exception as e:
                 logger.error(f"Chat ReAct agent failed: {e}", exc_info=True)
-                response_text = (
-                    f"I apologize, but I encountered an error. Please try again"
-                )
-            yield response_text
+                if not streamed:
+                    yield "I apologize, but I encountered an error. Please try again"
 
         except Exception as e:
             logger.error(f"Error in chat_medlm_async: {e}", exc_info=True)
@@ -200,6 +273,16 @@ class LLMService:
             prediction = self._timeline_predictor(record_input=record_input)
         return prediction
 
+    def summarize_timeline(self, record_summaries: list[str], events: list[str]):
+        self._ensure_initialized()
+        import dspy
+
+        with dspy.context(lm=self._lm):
+            prediction = self._timeline_summary_predictor(
+                record_summaries=record_summaries, events=events
+            )
+        return prediction
+
     def simplify_text(self, input_text: str):
         self._ensure_initialized()
         import dspy
@@ -218,6 +301,26 @@ class LLMService:
             )
         return prediction
 
+    def classify_and_summarize_batch(self, documents: list[str]) -> list:
+        """
+        Classify several documents in one LLM call.
+        Returns one result (with category and summary) per document, in order.
+        """
+        self._ensure_initialized()
+        import dspy
+
+        with dspy.context(lm=self._lm):
+            prediction = self._batch_classifier_predictor(
+                documents=[f"[{i}] {text}" for i, text in enumerate(documents)]
+            )
+
+        by_index = {r.document_index: r for r in prediction.results or []}
+        if set(by_index) != set(range(len(documents))):
+            raise ValueError(
+                f"Batch classification returned {len(by_index)} results for {len(documents)} documents"
+            )
+        return [by_index[i] for i in range(len(documents))]
+
     def analyze_vitals(self, input_data: str):
         self._ensure_initialized()
         import dspy
@@ -226,5 +329,75 @@ class LLMService:
             prediction = self._vital_signs_predictor(input_data=input_data)
         return prediction
 
+    async def analyze_trends_async(self, record_input: str):
+        return await self._run_async(self.analyze_trends, record_input)
+
+    async def extract_timeline_async(self, record_input: str):
+        return await self._run_async(self.extract_timeline, record_input)
+
+    async def simplify_text_async(self, input_text: str):
+        """
+        Simplify text, serving repeats from the simplify result cache.
+        Cache keys cover the normalised input, the model and the signature,
+        so prompt or model changes never return stale results.
+        """
+        import dspy
+
+        cache = self._get_simplify_cache()
+        key = self._simplify_cache_key(input_text)
+        cached = await cache.get(key)
+        if cached is not None:
+            return dspy.Prediction(**cached)
+
+        prediction = await self._run_async(self.simplify_text, input_text)
+        await cache.set(key, {"simplified": prediction.simplified})
+        return prediction
+
+    @classmethod
+    def _get_simplify_cache(cls) -> ResultCache:
+        if cls._simplify_cache is None:
+            cls._simplify_cache = ResultCache(
+                namespace="simplify",
+                ttl=settings.SIMPLIFY_CACHE_TTL_SECONDS,
+                maxsize=settings.SIMPLIFY_CACHE_MAX_ENTRIES,
+            )
+        return cls._simplify_cache
+
+    @classmethod
+    def signature_version(cls, name: str) -> str:
+        """
+        Hash of the model and a signature's fields, instructions and field
+        descriptions. Cached outputs keyed by it go stale when the prompt changes.
+        """
+        version = cls._signature_versions.get(name)
+        if version is None:
+            from .llm import signatures
+
+            sig = getattr(signatures, name)
+            descs = "|".join(
+                str((field.json_schema_extra or {}).get("desc", ""))
+                for field in sig.fields.values()
+            )
+            version = hashlib.sha256(
+                f"{cls.MODEL}|{sig.signature}|{sig.instructions}|{descs}".encode()
+            ).hexdigest()[:16]
+            cls._signature_versions[name] = version
+        return version
+
+    @classmethod
+    def _simplify_cache_key(cls, input_text: str) -> str:
+        normalized = " ".join(input_text.split())
+        digest = hashlib.sha256(normalized.encode()).hexdigest()
+        return f"{cls.signature_version('TextSimplificationSignature')}:{digest}"
+
+    async def simplify_cache_stats(self) -> dict:
+        return await self._get_simplify_cache().stats()
+
+    async def classify_and_summarize_async(self, document_text: str):
+        return await self._run_async(self.classify_and_summarize, document_text)
+
+    async def analyze_vitals_async(self, input_data: str):
+        return await self._run_async(self.analyze_vitals, input_data)
+
 
 llm_service = LLMService()
@@ -1,15 +1,24 @@
 """File storage service for managing uploaded medical files."""
 
+import hashlib
 import os
 import uuid
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, NamedTuple
 import logging
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredFile(NamedTuple):
+    storage_key: str
+    file_hash: str
+    file_size: int
+
 
 class StorageService:
     """Service for managing file storage on the local filesystem."""
@@ -26,9 +35,14 @@ class StorageService:
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"Storage service initialized with directory: {self.storage_dir}")
 
-    def save_file(self, file: BinaryIO, filename: str, user_id: str) -> str:
+    def save_file(self, file: BinaryIO, filename: str, user_id: str) -> StoredFile:
         """
-        Save a file to the storage directory.
+        Stream a file into content-addressed storage.
+
+        The file is copied in CHUNK_SIZE pieces to a temporary file while its
+        SHA-256 and size are computed, then moved to `<user_id>/<sha256><ext>`.
+        If that blob already exists the copy is discarded, so identical files
+        are only stored once per user.
 
         Args:
             file: File-like object to save
@@ -36,22 +50,74 @@ class StorageService:
             user_id: ID of the user uploading the file
 
         Returns:
-            str: Storage key (path) where the file was saved
+            StoredFile: Storage key, SHA-256 hex digest and size in bytes
         """
         user_dir = self.storage_dir / str(user_id)
         user_dir.mkdir(parents=True, exist_ok=True)
 
-        file_extension = Path(filename).suffix
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = user_dir / unique_filename
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = user_dir / f".{uuid.uuid4()}.part"
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            storage_key = self._store_blob(temp_path, digest.hexdigest(), filename, user_id)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
 
-        with open(file_path, "wb") as f:
-            content = file.read()
-            f.write(content)
+        logger.info(f"Saved file {filename} as {storage_key} ({size} bytes)")
+        return StoredFile(storage_key, digest.hexdigest(), size)
+
+    def upload_part_path(self, user_id: str, upload_id: str) -> Path:
+        """
+        Get the path a resumable upload is assembled in before finalizing.
 
-        storage_key = str(Path(str(user_id)) / unique_filename)
-        logger.info(f"Saved file {filename} as {storage_key}")
-        return storage_key
+        Args:
+            user_id: ID of the user uploading the file
+            upload_id: ID of the upload session
+
+        Returns:
+            Path: Full path to the partial file
+        """
+        upload_dir = self.storage_dir / str(user_id) / ".uploads"
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        return upload_dir / f"{upload_id}.part"
+
+    def finalize_upload(
+        self, part_path: Path, filename: str, user_id: str, file_hash: str | None = None
+    ) -> StoredFile:
+        """
+        Hash a fully received resumable upload and move it into content-addressed storage.
+
+        Args:
+            part_path: Path returned by upload_part_path
+            filename: Original filename
+            user_id: ID of the user uploading the file
+            file_hash: SHA-256 of the part file if the caller already computed it
+
+        Returns:
+            StoredFile: Storage key, SHA-256 hex digest and size in bytes
+        """
+        file_hash = file_hash or self.compute_file_hash(part_path)
+        size = part_path.stat().st_size
+        storage_key = self._store_blob(part_path, file_hash, filename, user_id)
+        logger.info(f"Finalized upload {filename} as {storage_key} ({size} bytes)")
+        return StoredFile(storage_key, file_hash, size)
+
+    def _store_blob(self, temp_path: Path, file_hash: str, filename: str, user_id: str) -> str:
+        """Move a fully written file to its content address, or drop it if already stored."""
+        blob_name = f"{file_hash}{Path(filename).suffix.lower()}"
+        blob_path = self.storage_dir / str(user_id) / blob_name
+        if blob_path.exists():
+            temp_path.unlink()
+        else:
+            os.replace(temp_path, blob_path)
+        return str(Path(str(user_id)) / blob_name)
 
     def get_file_path(self, storage_key: str) -> Path:
         """
@@ -69,6 +135,23 @@ class StorageService:
             raise FileNotFoundError(f"File not found: {storage_key}")
         return file_path
 
+    def compute_file_hash(self, file_path: Path, chunk_size: int = CHUNK_SIZE) -> str:
+        """
+        Compute the SHA-256 of a stored file without loading it into memory.
+
+        Args:
+            file_path: Full path to the file
+            chunk_size: Number of bytes read per iteration
+
+        Returns:
+            str: Hex encoded SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     def delete_file(self, storage_key: str) -> bool:
         """
         Delete a file from storage.
@@ -1,23 +1,189 @@
 import redis.asyncio as redis
 import redis as redis_sync
 from app.core.config import settings
+from fnmatch import fnmatchcase
+import asyncio
 import logging
 import json
+import threading
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Appends the event to the capped per-channel stream and publishes it, with
+# its stream ID, to live subscribers in one atomic round-trip.
+_XADD_PUBLISH = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[2], '{"id":"' .. id .. '","data":' .. ARGV[2] .. '}')
+return id
+"""
+
+# Adds newly queued records to a user's progress counter. Workers may have
+# counted some of them already, so when the processed count has caught up
+# the counter is cleared and the caller reports the batch as finished.
+_ADD_PROGRESS_TOTAL = """
+local total = redis.call('HINCRBY', KEYS[1], 'total', ARGV[1])
+local processed = tonumber(redis.call('HGET', KEYS[1], 'processed') or '0')
+if processed >= total then
+  redis.call('DEL', KEYS[1])
+else
+  redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {processed, total}
+"""
+
+# Adds a batch of processed records to a user's progress counter and clears
+# it once every queued record is done.
+_RECORD_PROGRESS = """
+local processed = redis.call('HINCRBY', KEYS[1], 'processed', ARGV[1])
+local total = tonumber(redis.call('HGET', KEYS[1], 'total') or '0')
+if total > 0 and processed >= total then
+  redis.call('DEL', KEYS[1])
+else
+  redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {processed, total}
+"""
+
+
+def _stream_id(event_id: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in event_id.split("-"))
+
+
+class StreamMultiplexer:
+    """Fans one pattern subscription out to in-memory queues, one per client.
+
+    A single Redis pubsub connection per process replaces one connection per
+    SSE client. Each client gets a bounded queue; when a slow client's queue
+    is full its oldest message is dropped rather than blocking the dispatcher.
+    """
+
+    def __init__(self, client: redis.Redis, pattern: str, queue_size: int):
+        self.redis = client
+        self.pattern = pattern
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+
+    def matches(self, channel: str) -> bool:
+        return fnmatchcase(channel, self.pattern)
+
+    def register(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unregister(self, channel: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(channel)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[channel]
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, channel: str, data: str):
+        for queue in tuple(self._subscribers.get(channel, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(self.pattern)
+                logger.info(f"Stream multiplexer subscribed to {self.pattern}")
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stream multiplexer connection lost: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
 
 class StreamService:
+    """Publishes status events to users and streams them back out over SSE.
+
+    With STREAM_BACKEND="streams" every event is also appended to a capped
+    Redis Stream per channel, so a reconnecting client can resume from the
+    Last-Event-ID it saw instead of losing events.
+
+    Worker-side publish_sync calls never touch Redis directly: messages are
+    buffered and a background flusher sends them through one pipeline every
+    STREAM_FLUSH_INTERVAL_MS, or sooner once STREAM_FLUSH_BATCH_SIZE are
+    queued. "in_progress" updates are coalesced per channel and event type
+    while they wait, so only the latest state is sent. Other statuses are
+    queued behind them, which keeps ordering.
+    """
+
+    COALESCED_STATUSES = {"in_progress"}
+
     def __init__(self):
         self.redis = redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
         self.redis_sync = redis_sync.from_url(
-            settings.CELERY_BROKER_URL, decode_responses=True
+            settings.CELERY_BROKER_URL,
+            decode_responses=True,
+            socket_timeout=settings.STREAM_PUBLISH_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.STREAM_PUBLISH_TIMEOUT_SECONDS,
+        )
+        self.use_streams = settings.STREAM_BACKEND == "streams"
+        self._xadd_publish = self.redis.register_script(_XADD_PUBLISH)
+        self._xadd_publish_sync = self.redis_sync.register_script(_XADD_PUBLISH)
+        self._add_progress_total = self.redis.register_script(_ADD_PROGRESS_TOTAL)
+        self._record_progress_sync = self.redis_sync.register_script(_RECORD_PROGRESS)
+        self.multiplexer = StreamMultiplexer(
+            self.redis, "user:*:status", settings.STREAM_CLIENT_QUEUE_SIZE
         )
+        # Entries are mutable [channel, message] pairs so a coalesced update
+        # can replace the message without losing its place in the queue.
+        self._buffer: deque[list] = deque()
+        self._coalescing: dict[tuple[str, str], list] = {}
+        # user_id -> records processed since the last flush
+        self._progress: dict[str, int] = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    @staticmethod
+    def _stream_key(channel: str) -> str:
+        return f"{channel}:events"
+
+    def _script_args(self, channel: str, message: dict) -> dict:
+        return {
+            "keys": [self._stream_key(channel), channel],
+            "args": [settings.STREAM_MAXLEN, json.dumps(message), settings.STREAM_TTL_SECONDS],
+        }
 
     async def publish(self, channel: str, message: dict):
         """Publish a JSON message to a Redis channel (async)."""
         try:
-            await self.redis.publish(channel, json.dumps(message))
+            if self.use_streams:
+                await self._xadd_publish(**self._script_args(channel, message))
+            else:
+                await self.redis.publish(channel, json.dumps(message))
         except Exception as e:
             logger.error(f"Error publishing to SSE: {e}")
 
@@ -25,14 +191,205 @@ class StreamService:
         """Publish a JSON message to a Redis channel (sync).
 
         Use this method in Celery workers to avoid event loop issues.
+        The message is queued and sent by the background flusher, so this
+        never blocks on Redis. If the buffer is full the oldest message is
+        dropped.
+        """
+        key = (channel, str(message.get("type")))
+        with self._buffer_lock:
+            if message.get("status") in self.COALESCED_STATUSES:
+                entry = self._coalescing.get(key)
+                if entry is not None:
+                    entry[1] = message
+                    return
+                entry = [channel, message]
+                self._coalescing[key] = entry
+            else:
+                # Anything queued before this stays ahead of it.
+                self._coalescing.pop(key, None)
+                entry = [channel, message]
+
+            if len(self._buffer) >= settings.STREAM_BUFFER_MAX:
+                dropped = self._buffer.popleft()
+                self._forget(dropped)
+                logger.warning(f"SSE publish buffer full, dropped a message for {dropped[0]}")
+            self._buffer.append(entry)
+            size = len(self._buffer)
+
+        self._ensure_flusher()
+        if size >= settings.STREAM_FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _forget(self, entry: list):
+        key = (entry[0], str(entry[1].get("type")))
+        if self._coalescing.get(key) is entry:
+            del self._coalescing[key]
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._buffer_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="sse-publisher", daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_loop(self):
+        interval = settings.STREAM_FLUSH_INTERVAL_MS / 1000
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            self.flush_sync()
+
+    def flush_sync(self):
+        """Send pending progress counts and every buffered message now, in Redis pipelines."""
+        with self._flush_lock:
+            self._flush_progress()
+            while True:
+                with self._buffer_lock:
+                    batch = []
+                    while self._buffer and len(batch) < settings.STREAM_FLUSH_BATCH_SIZE:
+                        entry = self._buffer.popleft()
+                        self._forget(entry)
+                        batch.append(entry)
+                if not batch:
+                    return
+                self._send_batch(batch)
+
+    def _flush_progress(self):
+        """Apply the buffered progress counts and queue an "n of m" event per user."""
+        with self._buffer_lock:
+            pending, self._progress = self._progress, {}
+        if not pending:
+            return
+
+        users = list(pending)
+        try:
+            pipe = self.redis_sync.pipeline(transaction=False)
+            for user_id in users:
+                self._record_progress_sync(
+                    keys=[f"user:{user_id}:progress"],
+                    args=[pending[user_id], settings.STREAM_TTL_SECONDS],
+                    client=pipe,
+                )
+            results = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error updating progress for {len(users)} users: {e}")
+            return
+
+        for user_id, (processed, total) in zip(users, results):
+            # Without a total the records' batch is still being queued;
+            # add_progress_total reports it if it has already finished.
+            if total > 0:
+                self.publish_sync(f"user:{user_id}:status", self._progress_event(processed, total))
+
+    def _send_batch(self, batch: list[list]):
+        try:
+            pipe = self.redis_sync.pipeline(transaction=False)
+            for channel, message in batch:
+                if self.use_streams:
+                    self._xadd_publish_sync(**self._script_args(channel, message), client=pipe)
+                else:
+                    pipe.publish(channel, json.dumps(message))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error publishing {len(batch)} messages to SSE: {e}")
+
+    @staticmethod
+    def _progress_event(processed: int, total: int) -> dict:
+        done = processed >= total
+        processed = min(processed, total)
+        return {
+            "type": "progress",
+            "status": "success" if done else "in_progress",
+            "processed": processed,
+            "total": total,
+            "message": f"Processed {processed} of {total} records",
+        }
+
+    async def add_progress_total(self, user_id: str, count: int):
+        """
+        Add records to the user's aggregated progress counter. Called once
+        their tasks are queued, so workers may finish before the total grows.
         """
         try:
-            self.redis_sync.publish(channel, json.dumps(message))
+            processed, total = await self._add_progress_total(
+                keys=[f"user:{user_id}:progress"],
+                args=[count, settings.STREAM_TTL_SECONDS],
+            )
         except Exception as e:
-            logger.error(f"Error publishing to SSE: {e}")
+            logger.error(f"Error updating progress total: {e}")
+            return
+
+        if processed >= total:
+            await self.publish(f"user:{user_id}:status", self._progress_event(processed, total))
+
+    def record_progress_sync(self, user_id: str):
+        """Count one processed record.
+
+        The count is buffered and applied by the background flusher, which
+        publishes the "n of m" progress event, so workers never wait on Redis.
+        """
+        with self._buffer_lock:
+            self._progress[user_id] = self._progress.get(user_id, 0) + 1
+        self._ensure_flusher()
+
+    async def subscribe_events(self, channel: str, last_event_id: str | None = None):
+        """Yield {"id", "data"} events for a multiplexed user channel.
+
+        In streams mode, events after last_event_id are replayed from the
+        Redis Stream before switching to live delivery; "id" is the stream
+        entry ID. In pubsub mode "id" is always None and nothing is replayed.
+        """
+        queue = self.multiplexer.register(channel)
+        try:
+            last = None
+            if self.use_streams and last_event_id:
+                try:
+                    last = _stream_id(last_event_id)
+                    # Registered before reading so nothing falls in the gap;
+                    # live duplicates of replayed entries are skipped below.
+                    entries = await self.redis.xrange(
+                        self._stream_key(channel), min=f"({last_event_id}", max="+"
+                    )
+                except Exception as e:
+                    logger.error(f"Error replaying events for {channel}: {e}")
+                    entries = []
+                for entry_id, fields in entries:
+                    last = _stream_id(entry_id)
+                    yield {"id": entry_id, "data": fields["data"]}
+
+            while True:
+                raw = await queue.get()
+                if not self.use_streams:
+                    yield {"id": None, "data": raw}
+                    continue
+
+                envelope = json.loads(raw)
+                if not isinstance(envelope, dict) or "id" not in envelope:
+                    # Published by a process still on the pubsub backend.
+                    yield {"id": None, "data": raw}
+                    continue
+                event_id = _stream_id(envelope["id"])
+                if last is not None and event_id <= last:
+                    continue
+                last = event_id
+                yield {"id": envelope["id"], "data": json.dumps(envelope["data"])}
+        finally:
+            self.multiplexer.unregister(channel, queue)
 
     async def subscribe(self, channel: str):
-        """Yield messages from a Redis channel."""
+        """Yield messages from a Redis channel.
+
+        User status channels are served from the shared multiplexer; any
+        other channel gets its own pubsub connection.
+        """
+        if self.multiplexer.matches(channel):
+            async for event in self.subscribe_events(channel):
+                yield event["data"]
+            return
+
         pubsub = self.redis.pubsub()
         await pubsub.subscribe(channel)
         try:
@@ -43,5 +400,8 @@ class StreamService:
             await pubsub.unsubscribe(channel)
             await pubsub.aclose()
 
+    async def close(self):
+        await self.multiplexer.close()
+
 
 stream_service = StreamService()
@@ -0,0 +1,80 @@
+"""Persistent cache of extracted document text keyed by file content hash."""
+
+import logging
+import zlib
+from pathlib import Path
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.core.crypto import encrypt_bytes, decrypt_bytes
+from app.core.db import engine
+from app.models import ExtractedText
+from app.services.extraction_service import TextExtractionService
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+
+class TextCacheService:
+    """
+    Stores the output of TextExtractionService once per unique file.
+
+    Entries are keyed by the SHA-256 of the file bytes, so the same document
+    is only parsed once no matter how many records or consumers point at it.
+    Text is zlib-compressed and then encrypted like chat content.
+    """
+
+    def get_text(self, file_path: Path, file_hash: str | None = None) -> str:
+        """
+        Return the extracted text for a file, parsing it only on a cache miss.
+
+        Args:
+            file_path: Full path to the stored file
+            file_hash: SHA-256 of the file if already known
+
+        Returns:
+            str: Extracted text
+        """
+        file_hash = file_hash or storage_service.compute_file_hash(file_path)
+
+        cached = self.lookup(file_hash)
+        if cached is not None:
+            logger.info(f"Extracted text cache hit for {file_hash[:12]}")
+            return cached
+
+        logger.info(f"Extracted text cache miss for {file_hash[:12]}, extracting...")
+        text = TextExtractionService.extract_text(file_path)
+        self.store(file_hash, text)
+        return text
+
+    def lookup(self, file_hash: str) -> str | None:
+        """Return cached text for a hash, or None if absent or unreadable."""
+        with Session(engine) as db:
+            entry = db.get(ExtractedText, file_hash)
+            if not entry:
+                return None
+
+            try:
+                return zlib.decompress(decrypt_bytes(entry.content)).decode("utf-8")
+            except Exception as e:
+                logger.error(f"Corrupt extracted text cache entry {file_hash[:12]}: {e}")
+                return None
+
+    def store(self, file_hash: str, text: str):
+        """Compress, encrypt and persist extracted text for a hash."""
+        entry = ExtractedText(
+            file_hash=file_hash,
+            content=encrypt_bytes(zlib.compress(text.encode("utf-8"))),
+            char_count=len(text),
+        )
+        with Session(engine) as db:
+            try:
+                db.merge(entry)
+                db.commit()
+            except IntegrityError:
+                # Another worker stored the same file concurrently.
+                db.rollback()
+
+
+text_cache_service = TextCacheService()
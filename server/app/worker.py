@@ -1,16 +1,20 @@
 import uuid
 from qdrant_client.models import PointStruct
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 from app.core.celery_app import celery_app
+from app.core.config import settings
 from app.core.db import engine
-from app.models import MedicalRecord, User, HealthTrend, TimelineEvent, HealthVital
+from app.models import MedicalRecord, HealthTrend, TimelineEvent, HealthVital
 from app.services.dicom_service import dicom_service
-from app.services.extraction_service import TextExtractionService
-from sqlmodel import Session
+from app.services.text_cache_service import text_cache_service
+from sqlmodel import Session, select, col
 from datetime import datetime, UTC
 from app.services.llm_service import llm_service
+from app.services.analysis_service import analysis_service
+from app.services.llm.classification_batcher import classification_batcher
 from app.services.storage import storage_service
 from app.services.stream_service import stream_service
 import logging
@@ -33,7 +37,7 @@ def analyze_and_store_document_content(text: str, record_id: str, user_id: str):
     )
 
     try:
-        prediction = llm_service.classify_and_summarize(text)
+        prediction = classification_batcher.classify(text)
         summary = prediction.summary
         category = prediction.category
 
@@ -102,6 +106,8 @@ def process_medical_record(record_id: str, user_id: str):
         record = db.get(MedicalRecord, record_id)
         if not record:
             logger.error(f"Record {record_id} not found")
+            # It was queued, so it still counts towards the user's progress.
+            stream_service.record_progress_sync(user_id)
             return
 
         try:
@@ -116,14 +122,31 @@ def process_medical_record(record_id: str, user_id: str):
                 },
             )
 
-            if record.file_type == "dicom":
+            if record.file_type == "dicom" and record.series_instances:
+                # Slice order and UIDs were parsed at upload; only the
+                # representative slices are decoded here.
+                instances = [dict(instance) for instance in record.series_instances]
+                result = dicom_service.process_series(
+                    [storage_service.get_file_path(i["s3_key"]) for i in instances],
+                    file_path.parent,
+                )
+
+                parent = Path(record.s3_key).parent
+                for index, images in result["previews"].items():
+                    instances[index]["images"] = [str(parent / image) for image in images]
+                record.series_instances = instances
+                record.extracted_images = [str(parent / image) for image in result["images"]]
+                record.processed_at = datetime.now(UTC)
+
+            elif record.file_type == "dicom":
                 output_dir = file_path.parent
                 result = dicom_service.process_dicom(file_path, output_dir)
-                image_rel_path = str(Path(record.s3_key).parent / result["image_path"])
-
-                image_key = str(Path(record.s3_key).parent / result["image_path"])
 
-                record.extracted_images = [image_key]
+                # Thumbnail, medium and full previews when available (smallest first).
+                images = result.get("images") or [result["image_path"]]
+                record.extracted_images = [
+                    str(Path(record.s3_key).parent / image) for image in images
+                ]
                 record.processed_at = datetime.now(UTC)
 
             elif record.file_type in ["pdf", "text", "docx", "doc", "txt"]:
@@ -131,7 +154,7 @@ def process_medical_record(record_id: str, user_id: str):
                     f"Processing text file: {record.file_name} (type: {record.file_type})"
                 )
 
-                text = TextExtractionService.extract_text(file_path)
+                text = text_cache_service.get_text(file_path, record.file_hash)
                 logger.info(
                     f"Text extracted: {len(text)} characters, preview: {text[:100]}"
                 )
@@ -170,6 +193,8 @@ def process_medical_record(record_id: str, user_id: str):
                     "message": f"Error processing {record.id}",
                 },
             )
+        finally:
+            stream_service.record_progress_sync(user_id)
 
 
 @celery_app.task(name="app.worker.run_analysis_job")
@@ -201,8 +226,16 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
     )
 
     with Session(engine) as db:
-        user = db.get(User, user_id)
-        records = user.records
+        # Only the columns needed to locate files; skips extracted_images etc.
+        records = db.exec(
+            select(
+                MedicalRecord.id,
+                MedicalRecord.file_name,
+                MedicalRecord.file_type,
+                MedicalRecord.s3_key,
+                MedicalRecord.file_hash,
+            ).where(MedicalRecord.user_id == user_id)
+        ).all()
 
         if not records:
             stream_service.publish_sync(
@@ -215,17 +248,27 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
             )
             return
 
-        full_text = ""
+        documents = []
         for r in records:
             try:
                 if r.file_type in ["pdf", "text", "docx", "doc", "txt"]:
                     file_path = storage_service.get_file_path(r.s3_key)
-                    text = TextExtractionService.extract_text(file_path)
-                    full_text += f"\n--- Record: {r.file_name} ---\n{text}\n"
+                    file_hash = r.file_hash or storage_service.compute_file_hash(
+                        file_path
+                    )
+                    text = text_cache_service.get_text(file_path, file_hash)
+                    documents.append(
+                        {
+                            "record_id": str(r.id),
+                            "file_name": r.file_name,
+                            "file_hash": file_hash,
+                            "text": text,
+                        }
+                    )
             except Exception as e:
                 logger.error(f"Failed to extract text from {r.id}: {e}")
 
-        if not full_text.strip():
+        if not any(d["text"].strip() for d in documents):
             stream_service.publish_sync(
                 f"user:{user_id}:status",
                 {
@@ -236,6 +279,52 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
             )
             return
 
+        # Long histories no longer fit one prompt: extract per record (cached
+        # by file hash) and merge, instead of sending the concatenated text.
+        total_chars = sum(len(d["text"]) for d in documents)
+        use_map_reduce = total_chars >= settings.ANALYSIS_MAP_REDUCE_MIN_CHARS
+        full_text = ""
+        if use_map_reduce:
+            logger.info(
+                f"Using map-reduce analysis for {len(documents)} records ({total_chars} chars)"
+            )
+        else:
+            full_text = "".join(
+                f"\n--- Record: {d['file_name']} ---\n{d['text']}\n" for d in documents
+            )
+
+        sources = {d["record_id"]: d["file_hash"] for d in documents}
+
+        def get_delta(model):
+            """
+            Return the previous analysis and the documents it has not seen yet.
+
+            Incremental runs only handle added records: if a record that fed the
+            previous analysis was removed or changed, (None, documents) is
+            returned so the caller re-analyses everything.
+            """
+            if not settings.ANALYSIS_INCREMENTAL:
+                return None, documents
+
+            with Session(engine) as db_session:
+                previous = db_session.exec(
+                    select(model)
+                    .where(model.user_id == user_id)
+                    .order_by(col(model.created_at).desc())
+                    .limit(1)
+                ).first()
+
+            if not previous or not previous.source_records:
+                return None, documents
+            if any(sources.get(rid) != h for rid, h in previous.source_records.items()):
+                return None, documents
+
+            delta = [d for d in documents if d["record_id"] not in previous.source_records]
+            logger.info(
+                f"Incremental {model.__name__} analysis: {len(delta)} new of {len(documents)} records"
+            )
+            return previous, delta
+
         def run_trends():
             stream_service.publish_sync(
                 f"user:{user_id}:status",
@@ -246,8 +335,35 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
                 },
             )
             try:
+                previous, delta = get_delta(HealthTrend)
+                if previous is not None and not delta:
+                    stream_service.publish_sync(
+                        f"user:{user_id}:status",
+                        {
+                            "type": "trend",
+                            "status": "success",
+                            "message": "Trend analysis is already up to date",
+                        },
+                    )
+                    return
+
                 record_ids = [str(r.id) for r in records]
-                prediction = llm_service.analyze_trends(full_text)
+                # An incremental run only maps when the records the previous
+                # analysis saw are served from the per-record extraction cache,
+                # so just the new ones reach the LLM. Otherwise mapping every
+                # record would cost more than one call over the full text.
+                new_ids = {d["record_id"] for d in delta}
+                seen = [d for d in documents if d["record_id"] not in new_ids]
+                if use_map_reduce or (
+                    previous is not None and analysis_service.has_extractions(seen)
+                ):
+                    mapped = analysis_service.map_documents(documents)
+                    prediction = analysis_service.analyze_trends(
+                        analysis_service.merge_timeline_events(mapped),
+                        analysis_service.merge_vitals(mapped),
+                    )
+                else:
+                    prediction = llm_service.analyze_trends(full_text)
                 trends = prediction.result
                 trend_summary = prediction.trend_summary
 
@@ -263,6 +379,7 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
                         user_id=user_id,
                         trend_summary=trend_summary,
                         analysis_data=analysis_data,
+                        source_records=sources,
                     )
                     db_session.add(health_trend)
                     db_session.commit()
@@ -296,25 +413,52 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
                 },
             )
             try:
+                previous, delta = get_delta(TimelineEvent)
+                if previous is not None and not delta:
+                    stream_service.publish_sync(
+                        f"user:{user_id}:status",
+                        {
+                            "type": "timeline",
+                            "status": "success",
+                            "message": "Timeline is already up to date",
+                        },
+                    )
+                    return
+
                 record_ids = [str(r.id) for r in records]
-                prediction = llm_service.extract_timeline(full_text)
-                events = prediction.result
+                analysis_data = []
+                if previous is not None:
+                    mapped = analysis_service.map_documents(delta, ["timeline"])
+                    analysis_data = analysis_service.merge_timeline_events(
+                        mapped, previous.analysis_data
+                    )
+                    prediction = analysis_service.summarize_timeline(
+                        mapped, analysis_data, previous.analysis_summary
+                    )
+                elif use_map_reduce:
+                    mapped = analysis_service.map_documents(documents, ["timeline"])
+                    analysis_data = analysis_service.merge_timeline_events(mapped)
+                    prediction = analysis_service.summarize_timeline(mapped, analysis_data)
+                else:
+                    prediction = llm_service.extract_timeline(full_text)
+                    events = prediction.result
+
+                    if events:
+                        for event in events:
+                            e_dict = event.model_dump()
+                            e_dict["record_ids"] = record_ids
+                            analysis_data.append(e_dict)
+
                 overall_summary = prediction.overall_summary
                 timeline_summary = prediction.timeline_summary
 
-                analysis_data = []
-                if events:
-                    for event in events:
-                        e_dict = event.model_dump()
-                        e_dict["record_ids"] = record_ids
-                        analysis_data.append(e_dict)
-
                 with Session(engine) as db_session:
                     timeline_event = TimelineEvent(
                         user_id=user_id,
                         analysis_summary=overall_summary,
                         timeline_summary=timeline_summary,
                         analysis_data=analysis_data,
+                        source_records=sources,
                     )
                     db_session.add(timeline_event)
                     db_session.commit()
@@ -356,19 +500,41 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
                 },
             )
             try:
-                prediction = llm_service.analyze_vitals(full_text)
-                vitals_analysis = prediction.analysis
+                previous, delta = get_delta(HealthVital)
+                if previous is not None and not delta:
+                    stream_service.publish_sync(
+                        f"user:{user_id}:status",
+                        {
+                            "type": "vitals",
+                            "status": "success",
+                            "message": "Vital signs analysis is already up to date",
+                        },
+                    )
+                    return
 
                 analysis_data = []
-                if vitals_analysis:
-                    for vital in vitals_analysis:
-                        v_dict = vital.model_dump()
-                        analysis_data.append(v_dict)
+                if previous is not None:
+                    mapped = analysis_service.map_documents(delta, ["vitals"])
+                    analysis_data = analysis_service.merge_vitals(
+                        mapped, previous.analysis_data
+                    )
+                elif use_map_reduce:
+                    mapped = analysis_service.map_documents(documents, ["vitals"])
+                    analysis_data = analysis_service.merge_vitals(mapped)
+                else:
+                    prediction = llm_service.analyze_vitals(full_text)
+                    vitals_analysis = prediction.analysis
+
+                    if vitals_analysis:
+                        for vital in vitals_analysis:
+                            v_dict = vital.model_dump()
+                            analysis_data.append(v_dict)
 
                 with Session(engine) as db_session:
                     health_vital = HealthVital(
                         user_id=user_id,
                         analysis_data=analysis_data,
+                        source_records=sources,
                     )
                     db_session.add(health_vital)
                     db_session.commit()
@@ -398,6 +564,23 @@ def run_analysis_job(user_id: str, job_type: str | None = None):
             run_timeline()
         elif job_type == "vitals":
             run_vitals()
+        elif (
+            settings.ANALYSIS_STAGE_CONCURRENCY > 1
+            and len(full_text) <= settings.ANALYSIS_CONCURRENT_MAX_CHARS
+        ):
+            # The stages are independent, network-bound LLM calls; each holds
+            # its own copy of the prompt, hence the size ceiling above.
+            logger.info("Running full analysis pipeline concurrently")
+            with ThreadPoolExecutor(
+                max_workers=settings.ANALYSIS_STAGE_CONCURRENCY
+            ) as pool:
+                stages = [
+                    pool.submit(run_timeline),
+                    pool.submit(run_trends),
+                    pool.submit(run_vitals),
+                ]
+                for stage in stages:
+                    stage.result()
         else:
             logger.info(
                 "Running full analysis pipeline sequentially to prevent memory exhaustion"
@@ -0,0 +1,216 @@
+"""
+Benchmark the per-user "latest row" queries behind the dashboard endpoints.
+
+Seeds bench users with realistic history into the database at DATABASE_URL,
+then prints the query plan and latency percentiles for each query. With
+--compare the same queries are first measured with the composite
+(user_id, created_at) indexes dropped inside a transaction that is rolled
+back, so one run shows before and after.
+
+Dropping an index takes an exclusive lock on its table, so only run this
+against a development database.
+
+Usage (from server/):
+    PYTHONPATH=. uv run python scripts/bench_latest_queries.py --compare
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, UTC
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from app.core.db import engine
+
+USER_PREFIX = "bench-"
+
+INDEXES = [
+    "ix_medicalrecord_user_id_created_at",
+    "ix_timelineevent_user_id_created_at",
+    "ix_healthtrend_user_id_created_at",
+    "ix_healthvital_user_id_created_at",
+    "ix_chat_session_user_id_updated_at",
+    "ix_chat_message_session_id_created_at",
+]
+
+QUERIES = {
+    "trends/latest": (
+        "SELECT * FROM healthtrend WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 1"
+    ),
+    "timeline/latest": (
+        "SELECT * FROM timelineevent WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 1"
+    ),
+    "vitals/latest": (
+        "SELECT * FROM healthvital WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 1"
+    ),
+    "records (page)": (
+        "SELECT id, file_name, created_at FROM medicalrecord WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 20"
+    ),
+    "chat/sessions": (
+        "SELECT * FROM chat_session WHERE user_id = :user_id "
+        "ORDER BY updated_at DESC"
+    ),
+    "chat/messages": (
+        "SELECT * FROM chat_message WHERE session_id = :session_id "
+        "ORDER BY created_at ASC"
+    ),
+}
+
+
+def seed(conn, users: int, rows: int, sessions: int, messages: int) -> list[dict]:
+    """Insert bench users and their history. Returns the ids used for queries."""
+    now = datetime.now(UTC).replace(tzinfo=None)
+    targets = []
+
+    for n in range(users):
+        user_id = f"{USER_PREFIX}{uuid4()}"
+        conn.execute(
+            text(
+                'INSERT INTO "user" (id, email, name, "emailVerified", "createdAt", "updatedAt") '
+                "VALUES (:id, :email, :name, false, :now, :now)"
+            ),
+            {"id": user_id, "email": f"{user_id}@bench.local", "name": f"Bench {n}", "now": now},
+        )
+
+        stamps = [now - timedelta(minutes=i) for i in range(rows)]
+        conn.execute(
+            text(
+                "INSERT INTO healthtrend (id, user_id, trend_summary, analysis_data, source_records, created_at, updated_at) "
+                "VALUES (:id, :user_id, 'bench', '[]', '{}', :ts, :ts)"
+            ),
+            [{"id": uuid4(), "user_id": user_id, "ts": ts} for ts in stamps],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO timelineevent (id, user_id, analysis_summary, timeline_summary, analysis_data, source_records, created_at, updated_at) "
+                "VALUES (:id, :user_id, 'bench', 'bench', '[]', '{}', :ts, :ts)"
+            ),
+            [{"id": uuid4(), "user_id": user_id, "ts": ts} for ts in stamps],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO healthvital (id, user_id, analysis_data, source_records, created_at, updated_at) "
+                "VALUES (:id, :user_id, '[]', '{}', :ts, :ts)"
+            ),
+            [{"id": uuid4(), "user_id": user_id, "ts": ts} for ts in stamps],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO medicalrecord (id, user_id, file_name, file_type, s3_key, mime_type, extracted_images, created_at) "
+                "VALUES (:id, :user_id, :name, 'pdf', 'bench', 'application/pdf', '[]', :ts)"
+            ),
+            [
+                {"id": uuid4(), "user_id": user_id, "name": f"record-{i}.pdf", "ts": ts}
+                for i, ts in enumerate(stamps)
+            ],
+        )
+
+        session_ids = [uuid4() for _ in range(sessions)]
+        conn.execute(
+            text(
+                "INSERT INTO chat_session (id, user_id, title, created_at, updated_at) "
+                "VALUES (:id, :user_id, 'bench', :ts, :ts)"
+            ),
+            [
+                {"id": sid, "user_id": user_id, "ts": now - timedelta(hours=i)}
+                for i, sid in enumerate(session_ids)
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO chat_message (id, session_id, user_id, role, content, created_at) "
+                "VALUES (:id, :session_id, :user_id, 'user', 'bench', :ts)"
+            ),
+            [
+                {
+                    "id": uuid4(),
+                    "session_id": sid,
+                    "user_id": user_id,
+                    "ts": now - timedelta(seconds=i),
+                }
+                for sid in session_ids
+                for i in range(messages)
+            ],
+        )
+
+        targets.append({"user_id": user_id, "session_id": random.choice(session_ids)})
+        print(f"Seeded user {n + 1}/{users}", end="\r")
+
+    print()
+    for table in ("healthtrend", "timelineevent", "healthvital", "medicalrecord", "chat_session", "chat_message"):
+        conn.execute(text(f"ANALYZE {table}"))
+    return targets
+
+
+def cleanup(conn):
+    """Delete everything owned by bench users."""
+    params = {"prefix": f"{USER_PREFIX}%"}
+    for table in ("chat_message", "chat_session", "healthtrend", "timelineevent", "healthvital", "medicalrecord"):
+        conn.execute(text(f"DELETE FROM {table} WHERE user_id LIKE :prefix"), params)
+    conn.execute(text('DELETE FROM "user" WHERE id LIKE :prefix'), params)
+
+
+def measure(conn, targets: list[dict], iterations: int, label: str):
+    print(f"\n=== {label} ===")
+    sample = targets[0]
+    for name, sql in QUERIES.items():
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), sample).scalars().all()
+
+        timings = []
+        for _ in range(iterations):
+            params = random.choice(targets)
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(
+            f"\n{name}: p50={statistics.median(timings):.2f}ms "
+            f"p95={p95:.2f}ms max={timings[-1]:.2f}ms"
+        )
+        for line in plan:
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=2000, help="analyses and records per user")
+    parser.add_argument("--sessions", type=int, default=50, help="chat sessions per user")
+    parser.add_argument("--messages", type=int, default=40, help="messages per chat session")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--compare", action="store_true", help="also measure without the indexes")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows afterwards")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        cleanup(conn)
+        targets = seed(conn, args.users, args.rows, args.sessions, args.messages)
+
+    try:
+        if args.compare:
+            with engine.connect() as conn:
+                transaction = conn.begin()
+                for index in INDEXES:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+                measure(conn, targets, args.iterations, "without composite indexes")
+                transaction.rollback()
+
+        with engine.connect() as conn:
+            measure(conn, targets, args.iterations, "with composite indexes")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                cleanup(conn)
+
+
+if __name__ == "__main__":
+    main()
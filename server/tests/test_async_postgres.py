@@ -0,0 +1,163 @@
+"""
+get_current_user and the chat routes against real Postgres through asyncpg.
+
+SQLite accepts timezone-aware datetimes in TIMESTAMP columns and asyncpg
+does not, so these only run when TEST_DATABASE_URL points at a disposable
+Postgres database; its tables are created and dropped by the tests.
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+
+from app.api import deps
+from app.api.routes import chat
+from app.core.db import async_database_url
+from app.models import User, Session as AuthSession, utcnow
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+class NoCache:
+    """Stands in for the Redis-backed session cache so every lookup hits the database."""
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl=None):
+        pass
+
+    async def delete(self, key):
+        pass
+
+
+@pytest.fixture
+def pg_engine():
+    engine = create_engine(TEST_DATABASE_URL)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def session_token(pg_engine):
+    """A user with a live session, as the auth service would store them."""
+    now = utcnow()
+    token = uuid4().hex
+    with Session(pg_engine) as db:
+        user = User(
+            id=str(uuid4()),
+            email=f"{token}@example.com",
+            name="Test User",
+            emailVerified=True,
+            createdAt=now,
+            updatedAt=now,
+        )
+        db.add(user)
+        db.flush()
+        db.add(
+            AuthSession(
+                id=str(uuid4()),
+                userId=user.id,
+                token=token,
+                expiresAt=now + timedelta(hours=1),
+                createdAt=now,
+                updatedAt=now,
+            )
+        )
+        db.commit()
+    return token
+
+
+@pytest.fixture
+def patched(monkeypatch):
+    monkeypatch.setattr(deps, "session_cache", NoCache())
+
+
+def make_request(token: str) -> Request:
+    cookie = f"__Secure-medlm.session_token={token}.signature"
+    return Request({"type": "http", "headers": [(b"cookie", cookie.encode())]})
+
+
+def run_with_async_session(test):
+    """Run test(engine, db) on a fresh asyncpg engine inside one event loop."""
+
+    async def main():
+        engine = create_async_engine(async_database_url(TEST_DATABASE_URL))
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                return await test(engine, db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_get_current_user_resolves_session(patched, session_token):
+    async def test(engine, db):
+        return await deps.get_current_user(make_request(session_token), db)
+
+    user = run_with_async_session(test)
+    assert user.email == f"{session_token}@example.com"
+
+
+def test_get_current_user_rejects_expired_session(patched, pg_engine, session_token):
+    with Session(pg_engine) as db:
+        db.execute(
+            update(AuthSession)
+            .where(AuthSession.token == session_token)
+            .values(expiresAt=utcnow() - timedelta(minutes=1))
+        )
+        db.commit()
+
+    async def test(engine, db):
+        with pytest.raises(HTTPException) as error:
+            await deps.get_current_user(make_request(session_token), db)
+        return error.value.status_code
+
+    assert run_with_async_session(test) == 401
+
+
+def test_chat_persists_session_and_messages(patched, session_token, monkeypatch):
+    async def fake_chat(**kwargs):
+        for chunk in ("Hello", " there"):
+            yield chunk
+
+    monkeypatch.setattr(chat.llm_service, "chat_medlm_async", fake_chat)
+
+    async def test(engine, db):
+        monkeypatch.setattr(chat, "async_engine", engine)
+        user = await deps.get_current_user(make_request(session_token), db)
+
+        response = await chat.chat_with_context(
+            chat.ChatRequest(message="How are my labs?"), current_user=user, db=db
+        )
+        async for _ in response.body_iterator:
+            pass
+        session_id = UUID(response.headers["X-Chat-Session-ID"])
+
+        sessions = await chat.list_chat_sessions(current_user=user, db=db)
+        messages = await chat.get_chat_messages(session_id, current_user=user, db=db)
+        return sessions, messages
+
+    sessions, messages = run_with_async_session(test)
+    assert [s.title for s in sessions] == ["How are my labs?"]
+    assert [(m.role, m.content) for m in messages] == [
+        ("user", "How are my labs?"),
+        ("ai", "Hello there"),
+    ]
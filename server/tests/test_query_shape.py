@@ -0,0 +1,193 @@
+"""Guards the number and shape of the SQL statements issued on hot paths."""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app.api.deps import CurrentUser
+from app.api.routes import analysis, upload
+from app.api.routes.analysis import has_records
+from app.models import HealthTrend, HealthVital, MedicalRecord, TimelineEvent, utcnow
+from app.services.stream_service import stream_service
+import app.worker as worker
+
+
+def add_record(engine, user_id: str, **fields):
+    with Session(engine) as db:
+        db.add(
+            MedicalRecord(
+                user_id=user_id,
+                file_name="scan.dcm",
+                file_type="dicom",
+                s3_key=f"{user_id}/scan.dcm",
+                mime_type="application/dicom",
+                extracted_images=["scan_thumb.webp", "scan_medium.webp", "scan.webp"],
+                **fields,
+            )
+        )
+        db.commit()
+
+
+def test_has_records_issues_one_exists_query(engine, statements):
+    add_record(engine, "user-1")
+    statements.clear()
+
+    with Session(engine) as db:
+        assert has_records(db, "user-1")
+        assert not has_records(db, "user-2")
+
+    assert len(statements) == 2
+    for statement in statements:
+        assert statement.startswith("SELECT EXISTS")
+        assert "extracted_images" not in statement
+
+
+def test_run_analysis_job_loads_records_in_one_projected_select(
+    engine, statements, monkeypatch
+):
+    add_record(engine, "user-1")
+    statements.clear()
+
+    published = []
+    monkeypatch.setattr(worker, "engine", engine)
+    monkeypatch.setattr(
+        stream_service, "publish_sync", lambda channel, message: published.append(message)
+    )
+
+    # A DICOM-only history has no text to analyse, so the job stops after loading.
+    worker.run_analysis_job("user-1", None)
+
+    assert published[-1]["message"] == "No text content found in records"
+    assert len(statements) == 1
+    statement = statements[0]
+    assert statement.startswith("SELECT ")
+    assert "FROM medicalrecord" in statement
+    assert "medicalrecord.s3_key" in statement
+    assert "extracted_images" not in statement
+    assert "series_instances" not in statement
+
+
+class AsyncExec:
+    """Lets routes that take an AsyncSession run on the sync SQLite engine; they only call exec()."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def exec(self, statement):
+        return self.db.exec(statement)
+
+
+CURRENT_USER = CurrentUser(id="user-1", email="user-1@example.com", name="User One")
+
+HISTORY = [
+    (analysis.get_trends, HealthTrend, "trends", {"trend_summary": "Stable"}),
+    (
+        analysis.get_timeline,
+        TimelineEvent,
+        "timeline_events",
+        {"analysis_summary": "Summary", "timeline_summary": "Timeline"},
+    ),
+    (analysis.get_vitals, HealthVital, "vitals", {}),
+]
+
+LATEST = [
+    (analysis.get_latest_trend, HealthTrend, {"trend_summary": "Stable"}),
+    (
+        analysis.get_latest_timeline,
+        TimelineEvent,
+        {"analysis_summary": "Summary", "timeline_summary": "Timeline"},
+    ),
+    (analysis.get_latest_vitals, HealthVital, {}),
+]
+
+
+def add_history(engine, model, count: int, **fields):
+    now = utcnow()
+    with Session(engine) as db:
+        for i in range(count):
+            created_at = now - timedelta(days=i)
+            db.add(
+                model(
+                    user_id="user-1",
+                    analysis_data=[{"day": i}],
+                    created_at=created_at,
+                    updated_at=created_at,
+                    **fields,
+                )
+            )
+        db.commit()
+
+
+@pytest.mark.parametrize("route, model, key, fields", HISTORY)
+def test_history_endpoints_issue_one_select_per_page(
+    engine, statements, route, model, key, fields
+):
+    add_history(engine, model, 5, **fields)
+    statements.clear()
+
+    pages = []
+    cursor = None
+    with Session(engine) as db:
+        while True:
+            page = asyncio.run(
+                route(limit=2, cursor=cursor, fields=None, current_user=CURRENT_USER, db=db)
+            )
+            pages.append(page[key])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len(statements) == len(pages)
+    for statement in statements:
+        assert statement.startswith("SELECT ")
+        assert "LIMIT" in statement
+
+
+@pytest.mark.parametrize("route, model, key, fields", HISTORY)
+def test_history_endpoints_select_only_requested_fields(
+    engine, statements, route, model, key, fields
+):
+    add_history(engine, model, 3, **fields)
+    statements.clear()
+
+    with Session(engine) as db:
+        page = asyncio.run(
+            route(limit=20, cursor=None, fields="created_at", current_user=CURRENT_USER, db=db)
+        )
+
+    assert len(page[key]) == 3
+    assert len(statements) == 1
+    assert "analysis_data" not in statements[0]
+
+
+@pytest.mark.parametrize("route, model, fields", LATEST)
+def test_latest_endpoints_issue_one_select(engine, statements, route, model, fields):
+    add_history(engine, model, 3, **fields)
+    statements.clear()
+
+    with Session(engine) as db:
+        latest = asyncio.run(route(current_user=CURRENT_USER, db=AsyncExec(db)))
+
+    assert latest["analysis_data"] == [{"day": 0}]
+    assert len(statements) == 1
+    assert "LIMIT" in statements[0]
+
+
+def test_list_medical_records_issues_one_projected_select(engine, statements):
+    for _ in range(3):
+        add_record(engine, "user-1")
+    statements.clear()
+
+    with Session(engine) as db:
+        listing = asyncio.run(
+            upload.list_medical_records(current_user=CURRENT_USER, db=AsyncExec(db))
+        )
+
+    assert len(listing["records"]) == 3
+    assert len(statements) == 1
+    assert "FROM medicalrecord" in statements[0]
+    assert "extracted_images" not in statements[0]
+    assert "series_instances" not in statements[0]